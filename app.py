@@ -1,47 +1,48 @@
 # app.py
+import time
+# Script start, for the time-to-first-render measurement below
+_script_start = time.perf_counter()
+
 import streamlit as st
-import re
-from src.ocr_engine import OCREngine
-from src.corrector import TextCorrector
 from src.braille_mapper import BrailleTranslator
-# from src.evaluator import Evaluator 
-from docx import Document 
+from src.jobs import JobStore, ensure_worker, QUEUED, DONE, FAILED, CANCELLED, LOADING, READY
+from src.instrumentation import Recorder, recording
+from src.cache import LRUCache, make_key
+from src.exports import create_word_document, write_brf
+from contextlib import nullcontext
+# Heavy modules (docx, the evaluator's Levenshtein; easyocr / transformers in
+# the job worker) are imported where they are first needed
+import hashlib
 import io
+import json
+import logging
+import uuid
+
+logger = logging.getLogger("pdf2braille.app")
 
 # --------------------------------------------------------------------------
 # Define utility functions
 # --------------------------------------------------------------------------
-def clean_final_text(text):
-    """
-    FIXED: Removes common repetitive OCR artifacts, including tokens with punctuation,
-    and repeated headers/phrases that span multiple lines.
-    """
-    # Replace :. with .
-    text = re.sub(r'\:\.', '.', text)
-    # Replace ;. with .
-    text = re.sub(r'\;\.', '.', text)
-    # Remove excessive blank lines
-    text = re.sub(r'(\n\s*){3,}', '\n\n', text)
-    
-    return text
-
-def create_word_document(text):
-    # Creates a Word document in memory from the provided text using python-docx
-    document = Document()
-    
-    paragraphs = text.split('\n\n')
-    for p_text in paragraphs:
-        p_text = p_text.replace('\n', ' ') 
-        
-        if "-- Page Break --" in p_text:
-            document.add_section() 
-        else:
-            document.add_paragraph(p_text)
-            
-    doc_buffer = io.BytesIO()
-    document.save(doc_buffer)
-    doc_buffer.seek(0)
-    return doc_buffer
+def show_timing_breakdown(timings):
+    # Per-stage timing panel built from instrumentation summaries
+    with st.expander("⏱️ Per-stage timing breakdown"):
+        st.dataframe(
+            [{"Stage": name, "Calls": stage['count'], "Total (s)": round(stage['total_seconds'], 3),
+              "Mean (ms)": round(stage['mean_seconds'] * 1000, 1), "Max (ms)": round(stage['max_seconds'] * 1000, 1)}
+             for name, stage in sorted(timings['summary'].items(), key=lambda item: -item[1]['total_seconds'])],
+            hide_index=True,
+        )
+        if timings['counters']:
+            st.dataframe(
+                [{"Counter": name, "Value": value} for name, value in sorted(timings['counters'].items())],
+                hide_index=True,
+            )
+        st.download_button(
+            label="Download timings (.json)",
+            data=json.dumps(timings, indent=2),
+            file_name="timings.json",
+            mime="application/json",
+        )
 # --------------------------------------------------------------------------
 
 
@@ -50,10 +51,18 @@ st.set_page_config(page_title="AI Braille Converter", layout="wide")
 
 st.title("⠠⠁⠃⠇⠑ AI Braille Converter")
 st.markdown("""
-**Upload a PDF document to convert it into Grade 1 Braille.** *Now saves output as a Microsoft Word document (.docx).*
+**Upload a PDF document to convert it into Grade 1 or Grade 2 (contracted) Braille.** *Saves output as a Microsoft Word document (.docx), or as a BRF file for embossers and braille displays.*
 """)
 
 use_correction = True
+# Conversions the background worker runs at the same time (one shared model set)
+JOB_CONCURRENCY = 1
+record_timings = st.checkbox("Record per-stage timings", value=True)
+pipelined = st.checkbox("Pipelined processing (overlap extraction, refinement and translation)", value=True)
+braille_grade = st.radio(
+    "Braille grade", [1, 2], horizontal=True,
+    format_func=lambda grade: "Grade 1 (uncontracted)" if grade == 1 else "Grade 2 (contracted)"
+)
 
 # --- INPUT FILES ---
 uploaded_file = st.file_uploader("Choose the PDF file to process", type="pdf", key="pdf_uploader")
@@ -61,111 +70,202 @@ uploaded_ground_truth = st.file_uploader("Optional: Upload Ground Truth Text Fil
 # --------------------
 
 # --- INITIALIZATION AND CACHING ---
-if 'processed_braille' not in st.session_state: st.session_state['processed_braille'] = None # Braille result cache
-if 'processed_english' not in st.session_state: st.session_state['processed_english'] = None # English result cache
-if 'uploaded_file_name' not in st.session_state: st.session_state['uploaded_file_name'] = None # Uploaded file name cache
-if 'uploaded_file_bytes' not in st.session_state: st.session_state['uploaded_file_bytes'] = None # Uploaded file bytes cache
-if 'raw_ocr_combined' not in st.session_state: st.session_state['raw_ocr_combined'] = None # Raw OCR combined text cache
+if 'upload_digests' not in st.session_state: st.session_state['upload_digests'] = {} # Uploader file_id -> SHA-256 of its content
 if 'evaluation_report' not in st.session_state: st.session_state['evaluation_report'] = None # Evaluation report cache
-if 'last_gt_key' not in st.session_state: st.session_state['last_gt_key'] = None # Added for robust GT caching
+if 'last_gt_key' not in st.session_state: st.session_state['last_gt_key'] = None # (document, ground truth) the report is for
+if 'job_ids' not in st.session_state: st.session_state['job_ids'] = {} # (document, settings) -> background job id
+if 'session_id' not in st.session_state: st.session_state['session_id'] = uuid.uuid4().hex # Subscribes this session to its jobs
+if 'cancelled_jobs' not in st.session_state: st.session_state['cancelled_jobs'] = set() # Jobs this session cancelled (others may still run them)
 
 # ----------------------------------
 # --- Load Engines with Caching ---
-from src.evaluator import Evaluator 
+# OCR and correction models live in the background job worker (src/jobs.py),
+# shared by every session; the app only needs the translator and evaluator.
+@st.cache_resource
+def load_job_store():
+    return JobStore()
+@st.cache_resource
+def load_translator(grade):
+    return BrailleTranslator(grade=grade)
 @st.cache_resource
-def load_engines():
-    return OCREngine(), TextCorrector(), BrailleTranslator()
+def load_result_store():
+    # Conversion results by content digest, shared by every session and user
+    return LRUCache(max_entries=32)
 def load_evaluation_engines():
+    from src.evaluator import Evaluator
     return Evaluator()
 # ----------------------------------
 
+def upload_digest(uploaded):
+    # Hashed once per upload; later reruns only look up the uploader's file_id
+    digests = st.session_state['upload_digests']
+    if uploaded.file_id not in digests:
+        digests[uploaded.file_id] = hashlib.sha256(uploaded.getbuffer()).hexdigest()
+    return digests[uploaded.file_id]
+
+@st.fragment(run_every=1.0)
+def show_job_progress(job_store, job_id):
+    # Polled every second without rerunning the rest of the page
+    job = job_store.get(job_id)
+    if job is None or job['status'] in (DONE, FAILED, CANCELLED) or job_id in st.session_state['cancelled_jobs']:
+        st.rerun()
+    if job['status'] == QUEUED:
+        position = job_store.queue_position(job_id)
+        st.info(f"Queued for conversion ({position} document(s) ahead)...")
+    else:
+        done, total = job['done'], job['total'] or 1
+        if job['stage'] == "ocr":
+            text = f"Extracting text from Page {done} of {total}..."
+        elif job['stage'] == "correct":
+            text = f"Refining text with Transformer AI ({done} of {total} lines)..."
+        elif job['stage'] == "pipeline":
+            text = f"Converted {done} of {total} pages (extract, refine, translate)..."
+        else:
+            text = "Extracting text (preserving layout)..."
+        st.progress(min(done / total, 1.0), text=text)
+    if job['cancel_requested']:
+        st.caption("Cancelling...")
+    elif st.button("Cancel conversion"):
+        # Only stops the job when no other session is waiting on it
+        job_store.cancel(job_id, session_id=st.session_state['session_id'])
+        st.session_state['cancelled_jobs'].add(job_id)
+        st.rerun()
+
+def build_export(result, name, build):
+    # Exports are built on first request and memoized on the shared result
+    if name not in result['exports']:
+        export_recorder = Recorder() if record_timings else None
+        with recording(export_recorder) if export_recorder is not None else nullcontext():
+            result['exports'][name] = build()
+        if export_recorder is not None:
+            result['export_timings'][name] = export_recorder.to_dict()
+    return result['exports'][name]
+
+def export_download(result, name, label, build, file_name, mime):
+    if name not in result['exports'] and not st.button(f"Prepare {label}", key=f"prepare_{name}"):
+        return
+    st.download_button(
+        label=f"Download {label}",
+        data=build_export(result, name, build),
+        file_name=file_name,
+        mime=mime,
+        key=f"download_{name}",
+    )
+
+# Engines the job worker warms up, in the order they are shown
+ENGINE_LABELS = {"ocr": "Text extraction (EasyOCR)", "corrector": "AI refinement (T5)"}
+
+def engines_settled(engines):
+    return all(engines.get(name, {}).get('status') not in (None, LOADING) for name in ENGINE_LABELS)
+
+def show_engine_status(engines):
+    for name, label in ENGINE_LABELS.items():
+        engine = engines.get(name)
+        if engine is None or engine['status'] == LOADING:
+            st.caption(f"⏳ {label}: loading...")
+        elif engine['status'] == READY:
+            st.caption(f"✅ {label}: ready (loaded in {engine['seconds']:.1f}s)")
+        else:
+            st.caption(f"❌ {label}: failed to load ({engine['error']})")
+
+@st.fragment(run_every=1.0)
+def show_engine_warmup(job_store):
+    # Polled while the worker loads its models; the page is redrawn once they are all settled
+    engines = job_store.engine_status()
+    if engines_settled(engines):
+        st.rerun()
+    show_engine_status(engines)
+
+# --- Start the worker right away: the models warm up while the page is already usable ---
+job_store = load_job_store()
+ensure_worker(job_store, concurrency=JOB_CONCURRENCY)
+with st.sidebar:
+    st.subheader("Models")
+    engine_status = job_store.engine_status()
+    if engines_settled(engine_status):
+        show_engine_status(engine_status)
+    else:
+        show_engine_warmup(job_store)
+
+# Time from script start until the page is interactive, once per session
+if 'first_render_seconds' not in st.session_state:
+    st.session_state['first_render_seconds'] = time.perf_counter() - _script_start
+    logger.info("first render in %.3fs", st.session_state['first_render_seconds'])
+
 # --------------------------------------------------------------------------
 # --- MAIN PROCESSING LOGIC ---
 if uploaded_file is not None:
-    # Read file content immediately to compare against the cached bytes
-    uploaded_file.seek(0)
-    current_file_bytes = uploaded_file.read()
+    document_digest = upload_digest(uploaded_file)
+    result_store = load_result_store()
+    result_key = (document_digest, use_correction)
+    result = result_store.get(result_key)
 
-    is_new_file = (
-        st.session_state['uploaded_file_name'] != uploaded_file.name or 
-        st.session_state['uploaded_file_bytes'] != current_file_bytes
-    )
-    
-    should_process = is_new_file or st.session_state['processed_braille'] is None
+    if result is None:
+        # --- Conversion runs in the background job worker ---
+        job_id = st.session_state['job_ids'].get(result_key)
+        job = job_store.get(job_id) if job_id is not None else None
+        if job is not None and job_id in st.session_state['cancelled_jobs']:
+            job = dict(job, status=CANCELLED)
 
-    if should_process:
-        
-        # Store the current file details
-        st.session_state['uploaded_file_name'] = uploaded_file.name
-        st.session_state['uploaded_file_bytes'] = current_file_bytes
-        
-        st.info("File Uploaded. Processing entire document... (This may take a moment)")
-        
-        # ocr_engine, corrector, translator, evaluator = load_engines()
-        ocr_engine, corrector, translator = load_engines()
-        evaluator = load_evaluation_engines()
-        # --- Step 1: OCR ---
-        with st.spinner("Extracting text (preserving layout)..."):
-            uploaded_file.seek(0) 
-            page_texts_raw = ocr_engine.process_pdf(uploaded_file)
-            num_pages = len(page_texts_raw)
-        
-        # --- Step 2 & 3: Process all pages ---
-        full_corrected_text = []
-        full_raw_ocr_text = []
-        progress_bar = st.progress(0, text="Processing Pages...")
-        
-        for i, raw_text in enumerate(page_texts_raw):
-            corrected_page_text = raw_text
-            
-            full_raw_ocr_text.append(raw_text)
-            
-            if use_correction:
-                with st.spinner(f"Refining Page {i + 1} with Transformer AI..."):
-                    corrected_page_text = corrector.correct_text(raw_text)
-            
-            # create_word_document(corrected_page_text)  # Pre-cache DOCX for each page if needed
-            # print(corrected_page_text)
-            full_corrected_text.append(corrected_page_text)
-            progress_bar.progress((i + 1) / num_pages, text=f"Processing Page {i + 1} of {num_pages}...")
-        
-        progress_bar.empty()
-        
-        # --- Final Compilation and Global Cleanup ---
-        final_corrected_text = "\n\n-- Page Break --\n\n".join(full_corrected_text)
-        final_corrected_text = clean_final_text(final_corrected_text)
+        if job is None or (job['status'] in (FAILED, CANCELLED) and st.session_state.get('retry_job')):
+            st.session_state['retry_job'] = False
+            ensure_worker(job_store, concurrency=JOB_CONCURRENCY)
+            job_id = job_store.submit(
+                uploaded_file.getvalue(),
+                {"use_correction": use_correction, "grade": braille_grade,
+                 "pipelined": pipelined, "record_timings": record_timings},
+                dedupe_key=make_key(document_digest, use_correction),
+                session_id=st.session_state['session_id'],
+            )
+            st.session_state['cancelled_jobs'].discard(job_id)
+            st.session_state['job_ids'][result_key] = job_id
+            job = job_store.get(job_id)
 
-        final_raw_ocr_text = "\n\n-- Page Break --\n\n".join(full_raw_ocr_text)
+        if job['status'] == FAILED:
+            st.error(f"Conversion failed: {job['error']}")
+            st.button("Try again", on_click=lambda: st.session_state.update(retry_job=True))
+            st.stop()
+        if job['status'] == CANCELLED:
+            st.warning("Conversion cancelled.")
+            st.button("Convert again", on_click=lambda: st.session_state.update(retry_job=True))
+            st.stop()
+        if job['status'] != DONE:
+            show_job_progress(job_store, job_id)
+            st.stop()
 
-        # --- Final Braille Translation ---
-        # braille_text_joined = translator.translate(final_raw_ocr_text)
-        braille_text_joined = translator.translate(final_corrected_text)
-        
-        # --- STORE RESULTS IN SESSION STATE ---
-        # st.session_state['processed_english'] = final_raw_ocr_text
-        st.session_state['processed_english'] = final_corrected_text
-        st.session_state['processed_braille'] = braille_text_joined
-        st.session_state['raw_ocr_combined'] = final_raw_ocr_text
-        st.session_state['evaluation_report'] = None
+        # --- STORE RESULTS IN THE SHARED STORE ---
+        conversion = job_store.result(job_id)
+        result = {
+            "english": conversion['english'],
+            "raw_english": conversion['raw_english'],
+            "page_sources": conversion['page_sources'],
+            "correction_stats": conversion.get('correction_stats'),
+            "page_reuse": conversion.get('page_reuse'),
+            "braille": {conversion['grade']: conversion['braille']},
+            "timings": conversion['timings'],
+            "exports": {},
+            "export_timings": {},
+        }
+        result_store.set(result_key, result)
         
         st.success("Conversion Complete! Results cached.")
     
+    # --- Grade switch: translate the cached English text once per grade ---
+    if braille_grade not in result['braille']:
+        result['braille'][braille_grade] = load_translator(braille_grade).translate(result['english'])
+
     # --- Evaluation Logic (Runs every time after processing is done) ---
-    if uploaded_ground_truth is not None and st.session_state['processed_english'] is not None:
+    if uploaded_ground_truth is not None:
         
-        uploaded_ground_truth.seek(0)
-        gt_key = uploaded_ground_truth.read()
+        gt_key = (document_digest, uploaded_ground_truth.file_id)
         
         if st.session_state['last_gt_key'] != gt_key or st.session_state['evaluation_report'] is None:
             
-            ocr_engine, corrector, translator = load_engines()
             evaluator = load_evaluation_engines()
             
-            uploaded_ground_truth.seek(0)
-            ground_truth_text = uploaded_ground_truth.read().decode("utf-8")
+            ground_truth_text = uploaded_ground_truth.getvalue().decode("utf-8")
             
-            # raw_ocr_text = st.session_state['raw_ocr_combined']
-            corrected_text = st.session_state['processed_english']
+            corrected_text = result['english']
 
             if corrected_text:
                 with st.spinner("Calculating Accuracy Metrics..."):
@@ -175,15 +275,41 @@ if uploaded_file is not None:
                     st.balloons() 
 
     # --- RETRIEVE CACHED RESULTS FOR DISPLAY/DOWNLOAD ---
-    final_text_joined = st.session_state['processed_english']
-    braille_text_joined = st.session_state['processed_braille']
-    final_raw_ocr_joined = st.session_state['raw_ocr_combined']
-    report = st.session_state['evaluation_report']
+    final_text_joined = result['english']
+    braille_text_joined = result['braille'][braille_grade]
+    # The report belongs to a (document, ground truth) pair; drop it when the document changes
+    last_gt_key = st.session_state['last_gt_key']
+    report = st.session_state['evaluation_report'] if last_gt_key is not None and last_gt_key[0] == document_digest else None
+    page_sources = result['page_sources']
     
-    # --- Generate DOCX in memory (done only when needed for download) ---
-    raw_ocr_docx_buffer = create_word_document(final_raw_ocr_joined)
-    english_docx_buffer = create_word_document(final_text_joined)
-    braille_docx_buffer = create_word_document(braille_text_joined)
+    if page_sources:
+        st.caption(
+            f"{page_sources.count('text_layer')} page(s) read from the PDF text layer, "
+            f"{page_sources.count('ocr_cache')} page(s) reused from the OCR cache, "
+            f"{page_sources.count('ocr')} page(s) OCR'd."
+        )
+    page_reuse = result.get('page_reuse')
+    if page_reuse and page_reuse['reused']:
+        st.caption(
+            f"{page_reuse['reused']} page(s) reused from an earlier upload, "
+            f"{page_reuse['recomputed']} page(s) recomputed."
+        )
+    correction_stats = result['correction_stats']
+    if correction_stats and correction_stats['regions']:
+        st.caption(
+            f"{correction_stats['skipped']} of {correction_stats['regions']} OCR region(s) were recognized "
+            f"confidently enough to skip AI refinement."
+        )
+
+    timings = result['timings']
+    if timings is not None and record_timings:
+        # Conversion timings plus those of any export built so far
+        exports = list(result['export_timings'].values())
+        show_timing_breakdown({
+            "spans": timings['spans'] + [export_span for export in exports for export_span in export['spans']],
+            "counters": timings['counters'],
+            "summary": {**timings['summary'], **{name: stage for export in exports for name, stage in export['summary'].items()}},
+        })
 
     # --------------------------------------------------------------------------
     # --- DISPLAY METRICS ---
@@ -192,7 +318,7 @@ if uploaded_file is not None:
         st.header("✨ Evaluation Results")
         st.markdown(f"**Ground Truth Size:** {report['raw_length']} characters")
         
-        col_corrected = st.columns(2)
+        col_corrected = st.columns(3)
 
         with col_corrected[0]:
             st.metric(
@@ -200,10 +326,24 @@ if uploaded_file is not None:
                 value=f"{report['corrected_cer']:.2f}%",
             )
         with col_corrected[1]:
+            st.metric(
+                label="Corrected WER",
+                value=f"{report['corrected_wer']:.2f}%",
+            )
+        with col_corrected[2]:
             st.metric(
                 label="Character Accuracy",
                 value=f"{report['character_accuracy']:.2f}%",
             )
+
+        # Per-page scores when the ground truth has matching page breaks
+        if len(report['pages']) > 1:
+            with st.expander("Per-page scores"):
+                st.dataframe(
+                    [{"Page": page['page'], "CER %": page['cer'] * 100, "WER %": page['wer'] * 100,
+                      "Character Accuracy %": page['character_accuracy']} for page in report['pages']],
+                    hide_index=True,
+                )
         st.divider()
 
     # --------------------------------------------------------------------------
@@ -220,9 +360,9 @@ if uploaded_file is not None:
         preview_text = preview_text[:1000] + ("..." if len(preview_text) > 1000 else "")
         st.text_area("English Preview", value=preview_text, height=400)
         
-        st.download_button(
-            label="Download Full English (.docx)",
-            data=english_docx_buffer,
+        export_download(
+            result, "english_docx", "Full English (.docx)",
+            lambda: create_word_document(final_text_joined).getvalue(),
             file_name="extracted_english_full.docx",
             mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
         )
@@ -234,9 +374,22 @@ if uploaded_file is not None:
         preview_braille = preview_braille[:1000] + ("..." if len(braille_text_joined) > 1000 else "")
         st.text_area("Braille Preview", value=preview_braille, height=400)
 
-        st.download_button(
-            label="Download Full Braille (.docx)",
-            data=braille_docx_buffer,
+        export_download(
+            result, f"braille_docx_grade{braille_grade}", "Full Braille (.docx)",
+            lambda: create_word_document(braille_text_joined).getvalue(),
             file_name="braille_output_full.docx",
             mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
         )
+
+        def build_brf():
+            # Braille ASCII pages for embossers and refreshable displays
+            buffer = io.BytesIO()
+            write_brf(braille_text_joined, buffer, translator=load_translator(braille_grade))
+            return buffer.getvalue()
+
+        export_download(
+            result, f"braille_brf_grade{braille_grade}", "Braille (.brf)",
+            build_brf,
+            file_name="braille_output.brf",
+            mime="application/octet-stream"
+        )
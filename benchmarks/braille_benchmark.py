@@ -0,0 +1,79 @@
+"""
+Micro-benchmark for BrailleTranslator.
+
+Times the compiled translator against the original per-character loop on
+the ground-truth texts. Their equivalence is tested in
+tests/test_braille_translator.py.
+
+    python -m benchmarks.braille_benchmark [--repeat 20]
+"""
+import argparse
+import glob
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.braille_mapper import BrailleTranslator
+
+GROUND_TRUTH_DIR = os.path.join("assets", "Ground_truth")
+
+def reference_translate(translator, text):
+    """The original Grade 1 loop, kept as the equivalence reference."""
+    braille_output = []
+    is_number_mode = False
+
+    for char in text:
+        if char.isdigit():
+            if not is_number_mode:
+                braille_output.append(translator.number_sign)
+                is_number_mode = True
+            braille_output.append(translator.num_map.get(char, ''))
+            continue
+        else:
+            is_number_mode = False
+
+        if char.isupper():
+            braille_output.append(translator.cap_sign)
+            char = char.lower()
+
+        if char in translator.map:
+            braille_output.append(translator.map[char])
+        else:
+            braille_output.append(' ')
+
+    return "".join(braille_output)
+
+
+def load_corpus(directory=GROUND_TRUTH_DIR):
+    texts = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            texts[os.path.basename(path)] = f.read()
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="timing repetitions per text")
+    args = parser.parse_args()
+
+    translator = BrailleTranslator()
+    texts = load_corpus()
+    if not texts:
+        sys.exit(f"No ground-truth texts found in {GROUND_TRUTH_DIR}")
+
+    corpus = "\n\n-- Page Break --\n\n".join(texts.values())
+    for label, fn in (
+        ("reference loop", lambda: reference_translate(translator, corpus)),
+        ("translate", lambda: translator.translate(corpus)),
+        ("translate_iter", lambda: "".join(translator.translate_iter(
+            corpus[i:i + 4096] for i in range(0, len(corpus), 4096)))),
+    ):
+        seconds = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        print(f"{label:>15}: {seconds * 1000:8.2f} ms  ({len(corpus) / seconds / 1e6:6.2f} M chars/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark of the correction tiers, separately and combined.
+
+Runs TextCorrector with tiers "symspell", "t5" and "symspell t5" over the
+same OCR-like input as benchmarks.corrector_backends (noisy
+assets/Ground_truth, or real OCR with --ocr) and reports time, model
+calls and CER against the ground truth. Also times the SymSpell index:
+build, memory-mapped load and per-token lookup, and checks that the
+dictionary pass leaves the (error-free) ground truth itself unchanged:
+exits 1 when it raises the WER of clean text.
+
+    python -m benchmarks.correction_tiers [--tiers symspell "symspell t5"] [--ocr]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.corrector import TextCorrector
+from src.evaluator import Evaluator
+from src.instrumentation import recording
+from src.postprocess import join_pages
+from src.symspell import SymSpell, build_index, _TOKEN
+from benchmarks.corrector_backends import load_inputs
+
+
+def benchmark_index(text):
+    index_dir = tempfile.mkdtemp(prefix="symspell_index_")
+    try:
+        start = time.perf_counter()
+        build_index(index_dir=index_dir)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        speller = SymSpell(index_dir=index_dir)
+        load_seconds = time.perf_counter() - start
+
+        tokens = [token for token in _TOKEN.findall(text) if not token.isdigit()]
+        start = time.perf_counter()
+        for token in tokens:
+            speller.correct_token(token)
+        lookup_seconds = time.perf_counter() - start
+        del speller
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+    print(f"SymSpell index: build {build_seconds:.2f}s, mmap load {load_seconds * 1000:.2f} ms, "
+          f"{len(tokens)} tokens in {lookup_seconds:.3f}s ({lookup_seconds / max(len(tokens), 1) * 1e6:.1f} us/token)")
+
+
+def check_clean_text(ground_truth, evaluator):
+    """WER (%) the dictionary pass adds to text that has no errors, and the first changed words."""
+    speller = SymSpell()
+    output = "\n".join(speller.correct_line(line)[0] for line in ground_truth.split("\n"))
+    changed = [(word, fixed) for word, fixed in zip(ground_truth.split(), output.split()) if word != fixed]
+    return evaluator.score_pages(output, ground_truth)["aggregate"]["wer"] * 100, changed[:10]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tiers", nargs="+", default=["symspell", "t5", "symspell t5"],
+                        help='tier combinations to run, e.g. "symspell t5"')
+    parser.add_argument("--max-unknown-ratio", type=float, default=0.15)
+    parser.add_argument("--ocr", action="store_true", help="use real OCR output of assets/PDFs as input")
+    parser.add_argument("--noise", type=float, default=0.03, help="synthetic OCR noise rate")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    inputs = load_inputs(args)
+    if not inputs:
+        sys.exit("No inputs with ground truth found")
+    evaluator = Evaluator()
+    input_text = join_pages(text for _, text, _ in inputs)
+    ground_truth = join_pages(gt for _, _, gt in inputs)
+    input_cer = evaluator.score_pages(input_text, ground_truth)["aggregate"]["cer"] * 100
+    print(f"{len(inputs)} document(s), input CER {input_cer:.2f}%")
+
+    benchmark_index(input_text)
+    clean_wer, changed = check_clean_text(ground_truth, evaluator)
+    print(f"SymSpell on the clean ground truth: WER {clean_wer:.2f}%" + (f", e.g. {changed}" if changed else ""))
+
+    for tiers in args.tiers:
+        tiers = tuple(tiers.split())
+        corrector = TextCorrector(cache_path=None, tiers=tiers, max_unknown_ratio=args.max_unknown_ratio)
+        with recording() as recorder:
+            start = time.perf_counter()
+            output = join_pages(corrector.correct_pages([text for _, text, _ in inputs]))
+            seconds = time.perf_counter() - start
+        counters = recorder.counters
+        cer = evaluator.score_pages(output, ground_truth)["aggregate"]["cer"] * 100
+        print(f"{' + '.join(tiers):>14}: {seconds:8.2f}s  model chunks {counters.get('correct.model_chunks', 0):5d}  "
+              f"dictionary-only lines {counters.get('correct.dictionary_lines', 0):5d}  "
+              f"CER {cer:6.2f}% ({cer - input_cer:+.2f})")
+
+    if clean_wer > 0:
+        sys.exit("REGRESSION: the SymSpell tier changes words of error-free text")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Speed and accuracy report for the TextCorrector inference backends.
+
+Each backend ("pytorch", "int8", "onnx") corrects the same OCR-like input,
+built by adding seeded OCR-style noise to the assets/Ground_truth texts (or
+the real OCR output of assets/PDFs with --ocr). Scored with Evaluator
+against the ground truth; the correction cache is disabled.
+
+    python -m benchmarks.corrector_backends --export-onnx models/t5-onnx   # once, needs network
+    python -m benchmarks.corrector_backends --model-dir models/t5-base --onnx-dir models/t5-onnx
+    python -m benchmarks.corrector_backends --backends pytorch int8 --output benchmarks/corrector_backends.json
+
+Reports load time, correction time, speedup over the first backend, CER
+before/after correction and how far each backend's output is from the
+first backend's (CER between the two outputs).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.corrector import TextCorrector
+from src.evaluator import Evaluator
+from src.postprocess import join_pages
+from benchmarks.braille_benchmark import GROUND_TRUTH_DIR, load_corpus
+
+# Common OCR confusions used to make the synthetic input
+OCR_CONFUSIONS = {"m": "rn", "l": "1", "O": "0", "e": "c", "i": "l", "S": "5", ",": ".", "a": "o"}
+
+
+def add_ocr_noise(text, rate, rng):
+    out = []
+    for char in text:
+        roll = rng.random()
+        if roll < rate and char in OCR_CONFUSIONS:
+            out.append(OCR_CONFUSIONS[char])
+        elif roll < rate * 1.2 and char.isalpha():
+            # Dropped character
+            continue
+        else:
+            out.append(char)
+    return "".join(out)
+
+
+def load_inputs(args):
+    """Returns [(name, input_text, ground_truth_text)]."""
+    if args.ocr:
+        import glob
+        from benchmarks.pipeline_benchmark import PDF_DIR, ground_truth_for
+        from src.ocr_engine import OCREngine
+        engine = OCREngine()
+        inputs = []
+        for pdf_path in sorted(glob.glob(os.path.join(PDF_DIR, "*.pdf"))):
+            ground_truth = ground_truth_for(pdf_path, GROUND_TRUTH_DIR)
+            if ground_truth is None:
+                continue
+            with open(pdf_path, "rb") as f:
+                inputs.append((os.path.basename(pdf_path), join_pages(engine.process_pdf(f)), ground_truth))
+        return inputs
+
+    rng = random.Random(args.seed)
+    return [(name, add_ocr_noise(text, args.noise, rng), text) for name, text in load_corpus().items()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(TextCorrector.BACKENDS), choices=TextCorrector.BACKENDS)
+    parser.add_argument("--model-dir", default=None, help="local PyTorch model directory (default: download)")
+    parser.add_argument("--onnx-dir", default=None, help="local exported ONNX model directory")
+    parser.add_argument("--export-onnx", metavar="DIR", default=None, help="export the model to ONNX in DIR and exit")
+    parser.add_argument("--ocr", action="store_true", help="use real OCR output of assets/PDFs as input")
+    parser.add_argument("--noise", type=float, default=0.03, help="synthetic OCR noise rate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--output", default=None, help="also write the report as JSON")
+    args = parser.parse_args()
+
+    if args.export_onnx:
+        TextCorrector.export_onnx(args.export_onnx, source=args.model_dir)
+        print(f"ONNX model written to {args.export_onnx}")
+        return
+
+    inputs = load_inputs(args)
+    if not inputs:
+        sys.exit("No inputs with ground truth found")
+    evaluator = Evaluator()
+    input_text = join_pages(text for _, text, _ in inputs)
+    ground_truth = join_pages(gt for _, _, gt in inputs)
+    input_cer = evaluator.score_pages(input_text, ground_truth)["aggregate"]["cer"] * 100
+    print(f"{len(inputs)} document(s), {len(input_text)} characters, input CER {input_cer:.2f}%")
+
+    report = {"input_cer": round(input_cer, 3), "backends": {}}
+    reference_output = None
+    reference_seconds = None
+    for backend in args.backends:
+        model_dir = args.onnx_dir if backend == "onnx" else args.model_dir
+        start = time.perf_counter()
+        corrector = TextCorrector(batch_size=args.batch_size, cache_path=None, backend=backend, model_dir=model_dir,
+                                  tiers=("t5",))
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        output = join_pages(corrector.correct_pages([text for _, text, _ in inputs]))
+        seconds = time.perf_counter() - start
+
+        cer = evaluator.score_pages(output, ground_truth)["aggregate"]["cer"] * 100
+        if reference_output is None:
+            reference_output, reference_seconds = output, seconds
+        result = {
+            "load_seconds": round(load_seconds, 3),
+            "seconds": round(seconds, 3),
+            "speedup": round(reference_seconds / seconds, 3) if seconds > 0 else None,
+            "cer": round(cer, 3),
+            "cer_change": round(cer - input_cer, 3),
+            # How much this backend's output differs from the first backend's
+            "cer_vs_reference": round(evaluator.calculate_cer(output, reference_output) * 100, 3),
+        }
+        report["backends"][backend] = result
+        print(f"{backend:>8}: load {result['load_seconds']:7.2f}s  correct {result['seconds']:8.2f}s  "
+              f"speedup {result['speedup'] or 0:5.2f}x  CER {result['cer']:6.2f}% ({result['cer_change']:+.2f})  "
+              f"vs {args.backends[0]} {result['cer_vs_reference']:5.2f}%")
+        del corrector
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+DOCX vs BRF export: time, peak memory and output size.
+
+Builds a "book" from the assets/Ground_truth texts (repeated --repeat times,
+pages joined with page break markers) and exports its braille as DOCX and as
+BRF. BRF is also streamed straight from translate_iter() chunks into a file,
+which is how a long document is exported without holding it in memory.
+
+    python -m benchmarks.export_benchmark [--repeat 20] [--grade 2]
+
+The BRF format itself is tested in tests/test_exports.py.
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.braille_mapper import BrailleTranslator
+from src.exports import create_word_document, write_brf
+from src.postprocess import join_pages
+from benchmarks.braille_benchmark import load_corpus
+
+
+def measure(build):
+    """Returns (result, seconds, peak MB allocated while building)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="copies of the corpus in the book")
+    parser.add_argument("--grade", type=int, default=1, choices=(1, 2))
+    args = parser.parse_args()
+
+    english = join_pages(list(load_corpus().values()) * args.repeat)
+    translator = BrailleTranslator(grade=args.grade)
+    braille = translator.translate(english)
+    print_pages = english.count("-- Page Break --") + 1
+    print(f"{print_pages} print pages, {len(english)} characters, {len(braille)} braille cells")
+
+    docx_bytes, docx_seconds, docx_peak = measure(lambda: create_word_document(braille).getvalue())
+
+    def brf_from_string():
+        buffer = io.BytesIO()
+        write_brf(braille, buffer, translator=translator)
+        return buffer.getvalue()
+    brf_bytes, brf_seconds, brf_peak = measure(brf_from_string)
+
+    # Translation and export together, chunk by chunk, into a file
+    fd, brf_path = tempfile.mkstemp(suffix=".brf")
+    os.close(fd)
+    try:
+        def brf_streamed():
+            chunks = (english[i:i + 4096] for i in range(0, len(english), 4096))
+            with open(brf_path, "wb") as f:
+                return write_brf(translator.translate_iter(chunks), f, translator=translator)
+        _, stream_seconds, stream_peak = measure(brf_streamed)
+    finally:
+        os.remove(brf_path)
+    # Every BRF page ends with a form feed
+    braille_pages = brf_bytes.count(b"\f")
+
+    print(f"{'DOCX':>22}: {docx_seconds:7.3f}s  peak {docx_peak:8.2f} MB  {len(docx_bytes) / 1e3:9.1f} KB")
+    print(f"{'BRF':>22}: {brf_seconds:7.3f}s  peak {brf_peak:8.2f} MB  {len(brf_bytes) / 1e3:9.1f} KB  "
+          f"({braille_pages} braille pages)")
+    print(f"{'BRF translate+stream':>22}: {stream_seconds:7.3f}s  peak {stream_peak:8.2f} MB")
+    # DOCX is zip-compressed; BRF is one byte per cell (UTF-8 braille takes three)
+    print(f"BRF vs DOCX: {docx_seconds / brf_seconds:.1f}x faster, {docx_peak / brf_peak:.0f}x less peak memory, "
+          f"{len(brf_bytes) / len(docx_bytes):.2f}x the size ({len(brf_bytes) / len(braille.encode()):.2f}x "
+          f"the UTF-8 braille)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Throughput benchmark for Grade 2 braille.
+
+Times Grade 1 against Grade 2 on the ground-truth texts and reports how
+much shorter the contracted output is. The contractions themselves are
+tested in tests/test_contractions.py.
+
+    python -m benchmarks.grade2_benchmark [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.braille_mapper import BrailleTranslator
+from src.contractions import compile_rules
+from benchmarks.braille_benchmark import load_corpus, GROUND_TRUTH_DIR
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="timing repetitions")
+    args = parser.parse_args()
+
+    texts = load_corpus()
+    if not texts:
+        sys.exit(f"No ground-truth texts found in {GROUND_TRUTH_DIR}")
+    corpus = "\n\n-- Page Break --\n\n".join(texts.values())
+
+    # Cold start: compiling the rule table
+    compile_rules.cache_clear()
+    start = time.perf_counter()
+    grade2 = BrailleTranslator(grade=2)
+    print(f"Grade 2 startup (rule compilation): {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    grade1 = BrailleTranslator(grade=1)
+    grade1_output = grade1.translate(corpus)
+    grade2_output = grade2.translate(corpus)
+
+    for label, fn in (
+        ("grade 1", lambda: grade1.translate(corpus)),
+        ("grade 2 (warm)", lambda: grade2.translate(corpus)),
+        ("grade 2 (cold)", lambda: BrailleTranslator(grade=2).translate(corpus)),
+    ):
+        seconds = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        print(f"{label:>15}: {seconds * 1000:8.2f} ms  ({len(corpus) / seconds / 1e6:6.2f} M chars/s)")
+
+    saved = 1 - len(grade2_output) / len(grade1_output)
+    print(f"Output cells: grade 1 {len(grade1_output)}, grade 2 {len(grade2_output)} ({saved:.1%} shorter)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Re-upload benchmark: converting a revised PDF with the per-page results of
+the original kept in a page store.
+
+Renders a PDF from assets/PDFs into an image-only copy (every page goes
+through OCR) and a revision of it with --changed pages edited. Then times:
+    original     - the original, with an empty page store
+    revision     - the revision, with the page store the original filled
+    fresh        - the revision with an empty page store (the reference)
+OCR and correction caches are off, so only the page store is reused.
+
+    python -m benchmarks.incremental_benchmark [--pdf assets/PDFs/pdf_1.pdf] [--changed 1] [--no-correction]
+
+That a revision gives exactly the output of a fresh run, recomputing only
+its changed pages, is tested in tests/test_pipeline.py.
+"""
+import argparse
+import glob
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from PIL import ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ocr_engine import OCREngine
+from src.corrector import TextCorrector
+from src.braille_mapper import BrailleTranslator
+from src.cache import SQLiteCache
+from src.pipeline import DocumentPipeline
+from benchmarks.pipeline_benchmark import PDF_DIR
+
+
+def image_pdf(images):
+    buffer = io.BytesIO()
+    images[0].save(buffer, format="PDF", save_all=True, append_images=images[1:])
+    return buffer.getvalue()
+
+
+def edited(image):
+    # Blank out the top third of the page, as if a paragraph was rewritten
+    image = image.copy()
+    ImageDraw.Draw(image).rectangle((0, 0, image.width, image.height // 3), fill="white")
+    return image
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default=None, help="source PDF (default: the longest in assets/PDFs)")
+    parser.add_argument("--changed", type=int, nargs="+", default=[1], help="1-based pages edited in the revision")
+    parser.add_argument("--no-correction", action="store_true", help="skip the T5 corrector")
+    parser.add_argument("--sequential", action="store_true", help="run the stages one after another")
+    args = parser.parse_args()
+
+    engine = OCREngine(workers=1, use_text_layer=False, cache_path=None)
+    corrector = None if args.no_correction else TextCorrector(cache_path=None)
+    translator = BrailleTranslator()
+
+    pdf_path = args.pdf
+    if pdf_path is None:
+        pdfs = sorted(glob.glob(os.path.join(PDF_DIR, "*.pdf")), key=os.path.getsize)
+        if not pdfs:
+            sys.exit(f"No PDFs found in {PDF_DIR}")
+        pdf_path = pdfs[-1]
+    with open(pdf_path, "rb") as f:
+        images = [page["image"] for page in engine.iter_rendered_pages(f)]
+    changed = sorted({page - 1 for page in args.changed if 1 <= page <= len(images)})
+    original = image_pdf(images)
+    revision = image_pdf([edited(image) if index in changed else image for index, image in enumerate(images)])
+    print(f"{os.path.basename(pdf_path)}: {len(images)} page(s), page(s) {[i + 1 for i in changed]} edited")
+
+    store_dir = tempfile.mkdtemp(prefix="incremental_benchmark_")
+    try:
+        def convert(pdf_bytes, store_name):
+            pipeline = DocumentPipeline(engine, corrector, translator, use_correction=corrector is not None,
+                                        page_store=SQLiteCache(os.path.join(store_dir, store_name)))
+            start = time.perf_counter()
+            result = pipeline.run(io.BytesIO(pdf_bytes), pipelined=not args.sequential)
+            return result, time.perf_counter() - start
+
+        runs = {}
+        runs["original"] = convert(original, "pages.sqlite")
+        runs["revision"] = convert(revision, "pages.sqlite")
+        runs["fresh"] = convert(revision, "fresh.sqlite")
+    finally:
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+    for name, (result, seconds) in runs.items():
+        reuse = result["page_reuse"]
+        print(f"{name:>9}: {seconds:8.2f}s  {reuse['reused']} page(s) reused, {reuse['recomputed']} recomputed")
+
+    print(f"Revision vs fresh: {runs['fresh'][1] / runs['revision'][1]:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
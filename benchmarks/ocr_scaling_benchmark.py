@@ -0,0 +1,63 @@
+"""
+OCR scaling benchmark for the multi-process CPU mode.
+
+OCRs the same PDF with 1, 2, 4, ... worker processes (up to the core count,
+or --max-workers) and reports wall time, pages/sec and speedup over one
+worker. The page cache and text layer are disabled so every page is OCR'd.
+That every worker count gives the same text is tested in tests/test_ocr_engine.py.
+
+    python -m benchmarks.ocr_scaling_benchmark [--pdf assets/PDFs/pdf_1.pdf] [--threads-per-worker 1]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ocr_engine import OCREngine
+
+DEFAULT_PDF = os.path.join("assets", "PDFs", "pdf_1.pdf")
+
+
+def worker_counts(max_workers):
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default=DEFAULT_PDF)
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--max-workers", type=int, default=None, help="default: cores / threads per worker")
+    parser.add_argument("--page-window", type=int, default=1, help="pages per task")
+    args = parser.parse_args()
+
+    with open(args.pdf, "rb") as f:
+        pdf_bytes = f.read()
+    max_workers = args.max_workers or max(1, (os.cpu_count() or 1) // args.threads_per_worker)
+
+    single = None
+    for workers in worker_counts(max_workers):
+        engine = OCREngine(device="cpu", workers=workers, threads_per_worker=args.threads_per_worker,
+                           page_window=args.page_window, use_text_layer=False, cache_path=None)
+        # Warm-up: start the workers and load their readers outside the timing
+        list(engine.iter_pages(pdf_bytes))
+        start = time.perf_counter()
+        texts = [page["text"] for page in engine.iter_pages(pdf_bytes)]
+        seconds = time.perf_counter() - start
+        engine.close()
+
+        if single is None:
+            single = seconds
+        print(f"{workers:>3} workers: {seconds:8.2f}s  {len(texts) / seconds:6.2f} pages/s  "
+              f"speedup {single / seconds:5.2f}x  (ideal {workers}x)")
+
+
+if __name__ == "__main__":
+    main()
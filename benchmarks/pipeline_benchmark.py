@@ -0,0 +1,353 @@
+"""
+Headless end-to-end benchmark over assets/PDFs.
+
+Runs every PDF through OCREngine -> TextCorrector -> BrailleTranslator the
+same way app.py does, scores each stage against the matching
+assets/Ground_truth file with Evaluator, and records wall time, pages/sec,
+peak RSS and CER per stage and per document. With --pipelined and/or
+--sequential each document is also converted by DocumentPipeline.run in that
+mode, and its wall time is reported next to the stage timings.
+
+The OCR and correction caches are off unless --cache is given, so a
+baseline and the runs compared against it both do the full work. Peak RSS
+per stage is sampled while that stage runs (this process only, not OCR
+worker processes); "process_peak_rss_mb" is the cumulative process peak.
+
+    python -m benchmarks.pipeline_benchmark                      # run + compare
+    python -m benchmarks.pipeline_benchmark --save-baseline      # record a baseline
+    python -m benchmarks.pipeline_benchmark --max-slowdown 0.10 --max-cer-increase 0.5
+    python -m benchmarks.pipeline_benchmark --pipelined --sequential   # both DocumentPipeline modes
+
+Exits with status 1 when a stage (or pipeline mode) is slower than the
+baseline by more than --max-slowdown, or its CER rose by more than
+--max-cer-increase points.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ocr_engine import OCREngine
+from src.corrector import TextCorrector
+from src.braille_mapper import BrailleTranslator
+from src.evaluator import Evaluator
+from src.pipeline import DocumentPipeline
+from src.postprocess import clean_final_text, join_pages
+from src.instrumentation import recording
+
+PDF_DIR = os.path.join("assets", "PDFs")
+GROUND_TRUTH_DIR = os.path.join("assets", "Ground_truth")
+RESULTS_PATH = os.path.join("benchmarks", "results.json")
+BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+
+STAGES = ("ocr", "correct", "translate")
+PIPELINE_MODES = ("pipelined", "sequential")
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS reports bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def current_rss_mb():
+    """Resident set size of this process right now, in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        # Not Linux
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+class RSSSampler:
+    """Samples the RSS of this process while the block runs; `peak_mb` is the highest seen."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while True:
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self.peak_mb = current_rss_mb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+
+def ground_truth_for(pdf_path, gt_dir):
+    # pdf_1.pdf -> pdf_1_ground_truth.txt
+    name = os.path.splitext(os.path.basename(pdf_path))[0]
+    gt_path = os.path.join(gt_dir, f"{name}_ground_truth.txt")
+    if not os.path.exists(gt_path):
+        return None
+    with open(gt_path, encoding="utf-8") as f:
+        return f.read()
+
+
+def stage_result(seconds, num_pages, rss, cer=None):
+    return {
+        "seconds": round(seconds, 4),
+        "pages_per_sec": round(num_pages / seconds, 3) if seconds > 0 else None,
+        "peak_rss_mb": round(rss.peak_mb, 1),
+        "cer": None if cer is None else round(cer * 100, 3),
+    }
+
+
+def run_document(pdf_path, ground_truth, engines, use_correction):
+    ocr_engine, corrector, translator, evaluator = engines
+    stages = {}
+
+    # --- OCR ---
+    start = time.perf_counter()
+    with RSSSampler() as rss, open(pdf_path, "rb") as pdf_file:
+        pages = list(ocr_engine.iter_pages(pdf_file))
+    page_texts = [page["text"] for page in pages]
+    num_pages = len(page_texts)
+    raw_text = join_pages(page_texts)
+    stages["ocr"] = stage_result(
+        time.perf_counter() - start, num_pages, rss,
+        evaluator.calculate_cer(raw_text, ground_truth) if ground_truth is not None else None
+    )
+
+    # --- Correction ---
+    start = time.perf_counter()
+    correction_stats = {"regions": 0, "skipped": 0}
+    with RSSSampler() as rss:
+        if use_correction:
+            page_texts = corrector.correct_pages(page_texts, regions=[page["regions"] for page in pages],
+                                                 stats=correction_stats, sources=[page["source"] for page in pages])
+        corrected_text = clean_final_text(join_pages(page_texts))
+    stages["correct"] = stage_result(
+        time.perf_counter() - start, num_pages, rss,
+        evaluator.calculate_cer(corrected_text, ground_truth) if ground_truth is not None else None
+    )
+
+    # --- Braille ---
+    start = time.perf_counter()
+    with RSSSampler() as rss:
+        translator.translate(corrected_text)
+    stages["translate"] = stage_result(time.perf_counter() - start, num_pages, rss)
+
+    return {
+        "pages": num_pages,
+        "page_sources": {source: [page["source"] for page in pages].count(source)
+                         for source in sorted({page["source"] for page in pages})},
+        # Confidence gating: OCR regions that skipped the model
+        "correction_stats": correction_stats,
+        "total_seconds": round(sum(stage["seconds"] for stage in stages.values()), 4),
+        # Highest RSS of the process since it started (only ever goes up across documents)
+        "process_peak_rss_mb": round(peak_rss_mb(), 1),
+        "stages": stages,
+    }
+
+
+def run_pipeline_modes(pdf_path, ground_truth, engines, use_correction, modes):
+    """Wall time, peak RSS and final CER of DocumentPipeline.run on the document, per mode."""
+    ocr_engine, corrector, translator, evaluator = engines
+    pipeline = DocumentPipeline(ocr_engine, corrector, translator, use_correction=use_correction)
+    timings = {}
+    for mode in modes:
+        start = time.perf_counter()
+        with RSSSampler() as rss, open(pdf_path, "rb") as pdf_file:
+            result = pipeline.run(pdf_file, pipelined=mode == "pipelined")
+        timings[mode] = stage_result(
+            time.perf_counter() - start, len(result["raw_pages"]), rss,
+            evaluator.calculate_cer(result["english"], ground_truth) if ground_truth is not None else None
+        )
+    return timings
+
+
+def compare(results, baseline, max_slowdown, max_cer_increase, min_seconds):
+    """Returns a list of human-readable regressions against the baseline."""
+    regressions = []
+    for name, document in results["documents"].items():
+        base_document = baseline.get("documents", {}).get(name)
+        if base_document is None:
+            continue
+        checks = [(stage, document["stages"][stage], base_document["stages"].get(stage)) for stage in STAGES]
+        checks += [(f"pipeline {mode}", timing, base_document.get("pipeline", {}).get(mode))
+                   for mode, timing in document.get("pipeline", {}).items()]
+        for stage, current, base in checks:
+            if base is None:
+                continue
+            # Very short stages are timing noise
+            if base["seconds"] >= min_seconds and current["seconds"] > base["seconds"] * (1 + max_slowdown):
+                regressions.append(
+                    f"{name} {stage}: {current['seconds']:.3f}s vs baseline {base['seconds']:.3f}s "
+                    f"(+{current['seconds'] / base['seconds'] - 1:.0%}, limit +{max_slowdown:.0%})"
+                )
+            if current["cer"] is not None and base["cer"] is not None and current["cer"] > base["cer"] + max_cer_increase:
+                regressions.append(
+                    f"{name} {stage}: CER {current['cer']:.2f}% vs baseline {base['cer']:.2f}% "
+                    f"(limit +{max_cer_increase:.2f} points)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf-dir", default=PDF_DIR)
+    parser.add_argument("--gt-dir", default=GROUND_TRUTH_DIR)
+    parser.add_argument("--output", default=RESULTS_PATH, help="results JSON file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--max-slowdown", type=float, default=0.20, help="allowed fractional slowdown per stage")
+    parser.add_argument("--max-cer-increase", type=float, default=1.0, help="allowed CER increase in percentage points")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="ignore slowdowns of stages faster than this")
+    parser.add_argument("--no-correction", action="store_true", help="skip the T5 correction stage")
+    parser.add_argument("--cache", action="store_true",
+                        help="use the OCR and correction caches (repeat runs then mostly measure cache hits)")
+    parser.add_argument("--grade", type=int, default=1, choices=(1, 2), help="braille grade")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="also time DocumentPipeline.run with the stages overlapped")
+    parser.add_argument("--sequential", action="store_true",
+                        help="also time DocumentPipeline.run with one stage after another")
+    parser.add_argument("--corrector-backend", default="pytorch", choices=TextCorrector.BACKENDS)
+    parser.add_argument("--model-dir", default=None, help="local corrector model directory")
+    parser.add_argument("--tiers", nargs="+", default=list(TextCorrector.DEFAULT_TIERS), choices=TextCorrector.TIERS,
+                        help="correction tiers, in order")
+    parser.add_argument("--confidence-threshold", type=float, default=0.9,
+                        help="OCR confidence at which a region skips correction (negative: correct everything)")
+    parser.add_argument("--device", default="auto", choices=("auto", "cpu", "cuda", "mps"), help="OCR device")
+    parser.add_argument("--ocr-workers", type=int, default=None, help="OCR worker processes on CPU (default: per core, at most 4)")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="torch/OpenCV threads per OCR worker")
+    parser.add_argument("--dpi", type=int, default=200, help="OCR render resolution")
+    parser.add_argument("--adaptive-dpi", type=int, default=None,
+                        help="re-read small / low-confidence lines from a re-render at this resolution")
+    parser.add_argument("--rgb", action="store_true", help="render pages in colour instead of grayscale")
+    args = parser.parse_args()
+
+    pdf_paths = sorted(glob.glob(os.path.join(args.pdf_dir, "*.pdf")))
+    modes = [mode for mode in PIPELINE_MODES if getattr(args, mode)]
+    if not pdf_paths:
+        sys.exit(f"No PDFs found in {args.pdf_dir}")
+
+    # --- Engines (load time reported separately) ---
+    start = time.perf_counter()
+    cache_kwargs = {} if args.cache else {"cache_path": None}
+    engines = (
+        OCREngine(device=args.device, workers=args.ocr_workers, threads_per_worker=args.threads_per_worker,
+                  dpi=args.dpi, adaptive_dpi=args.adaptive_dpi, grayscale=not args.rgb, **cache_kwargs),
+        TextCorrector(backend=args.corrector_backend, model_dir=args.model_dir,
+                      confidence_threshold=args.confidence_threshold if args.confidence_threshold >= 0 else None,
+                      tiers=tuple(args.tiers),
+                      **cache_kwargs)
+        if not args.no_correction else None,
+        BrailleTranslator(grade=args.grade),
+        Evaluator(),
+    )
+    load_seconds = time.perf_counter() - start
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "correction": not args.no_correction,
+            "cache": args.cache,
+            "grade": args.grade,
+            "pipeline_modes": modes,
+            "corrector_backend": args.corrector_backend,
+            "confidence_threshold": args.confidence_threshold,
+            "correction_tiers": args.tiers,
+            "ocr_device": engines[0].device,
+            "ocr_workers": engines[0].workers,
+            "ocr_dpi": args.dpi,
+            "ocr_adaptive_dpi": args.adaptive_dpi,
+            "ocr_grayscale": not args.rgb,
+            "engine_load_seconds": round(load_seconds, 3),
+        },
+        "documents": {},
+    }
+
+    for pdf_path in pdf_paths:
+        name = os.path.basename(pdf_path)
+        print(f"{name} ...", flush=True)
+        ground_truth = ground_truth_for(pdf_path, args.gt_dir)
+        with recording() as recorder:
+            document = run_document(pdf_path, ground_truth, engines, not args.no_correction)
+        # Fine-grained spans (rasterize / detect / recognize / generate) and counters
+        document["instrumentation"] = {"summary": recorder.summary(), "counters": recorder.counters}
+        results["documents"][name] = document
+        for stage in STAGES:
+            result = document["stages"][stage]
+            cer = "" if result["cer"] is None else f"  CER {result['cer']:6.2f}%"
+            print(f"  {stage:>10}: {result['seconds']:8.3f}s  {result['pages_per_sec'] or 0:8.2f} pages/s  "
+                  f"stage peak RSS {result['peak_rss_mb']:8.1f} MB{cer}")
+        if modes:
+            # Same input and engines; outside the recording above so its spans stay per stage
+            document["pipeline"] = run_pipeline_modes(pdf_path, ground_truth, engines, not args.no_correction, modes)
+            for mode, result in document["pipeline"].items():
+                cer = "" if result["cer"] is None else f"  CER {result['cer']:6.2f}%"
+                print(f"  {mode:>10}: {result['seconds']:8.3f}s  {result['pages_per_sec'] or 0:8.2f} pages/s  "
+                      f"peak RSS {result['peak_rss_mb']:8.1f} MB{cer}  (DocumentPipeline.run)")
+            if len(modes) == 2:
+                timing = document["pipeline"]
+                print(f"  pipelined vs sequential: {timing['sequential']['seconds'] / timing['pipelined']['seconds']:.2f}x")
+
+    totals = {}
+    total_pages = sum(document["pages"] for document in results["documents"].values())
+    for stage in STAGES:
+        seconds = sum(document["stages"][stage]["seconds"] for document in results["documents"].values())
+        totals[stage] = {"seconds": round(seconds, 4),
+                         "pages_per_sec": round(total_pages / seconds, 3) if seconds > 0 else None}
+    for mode in modes:
+        seconds = sum(document["pipeline"][mode]["seconds"] for document in results["documents"].values())
+        totals[f"pipeline_{mode}"] = {"seconds": round(seconds, 4),
+                                      "pages_per_sec": round(total_pages / seconds, 3) if seconds > 0 else None}
+    results["totals"] = totals
+
+    output_path = args.baseline if args.save_baseline else args.output
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output_path}")
+
+    if args.save_baseline:
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("meta", {}).get("cache", True) != args.cache:
+        print("Warning: the baseline was recorded with a different --cache setting; timings are not comparable.")
+    regressions = compare(results, baseline, args.max_slowdown, args.max_cer_increase, args.min_seconds)
+    if regressions:
+        print("REGRESSIONS:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
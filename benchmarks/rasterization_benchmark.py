@@ -0,0 +1,115 @@
+"""
+Rasterization settings benchmark: image size, time and accuracy per page.
+
+OCRs every PDF in assets/PDFs that has a ground truth with each render
+configuration (text layer and page cache off, single process) and reports
+per page: size of the rendered page array, rasterize time, OCR time and
+CER against assets/Ground_truth, plus what each configuration saves
+compared to the first one.
+
+    python -m benchmarks.rasterization_benchmark
+    python -m benchmarks.rasterization_benchmark --configs rgb-200 adaptive-150-300 --output benchmarks/rasterization.json
+
+Configurations:
+    rgb-200           RGB at 200 dpi (the previous default)
+    gray-200          8-bit grayscale at 200 dpi (current default)
+    gray-150          grayscale at 150 dpi
+    adaptive-150-300  grayscale at 150 dpi; small / low-confidence lines re-read at 300 dpi
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ocr_engine import OCREngine
+from src.evaluator import Evaluator
+from src.instrumentation import recording
+from src.postprocess import join_pages
+from benchmarks.pipeline_benchmark import PDF_DIR, GROUND_TRUTH_DIR, ground_truth_for
+
+CONFIGS = {
+    "rgb-200": {"grayscale": False, "dpi": 200},
+    "gray-200": {"grayscale": True, "dpi": 200},
+    "gray-150": {"grayscale": True, "dpi": 150},
+    "adaptive-150-300": {"grayscale": True, "dpi": 150, "adaptive_dpi": 300},
+}
+
+
+def run_config(settings, documents, render_threads):
+    engine = OCREngine(workers=1, use_text_layer=False, cache_path=None, render_threads=render_threads, **settings)
+    evaluator = Evaluator()
+    outputs = []
+    pages = 0
+    start = time.perf_counter()
+    with recording() as recorder:
+        for pdf_bytes, _ in documents:
+            texts = engine.process_pdf(pdf_bytes)
+            pages += len(texts)
+            outputs.append(join_pages(texts))
+    seconds = time.perf_counter() - start
+
+    summary = recorder.summary()
+    counters = recorder.counters
+
+    def stage_seconds(*names):
+        return sum(summary[name]["total_seconds"] for name in names if name in summary)
+
+    pages = max(pages, 1)
+    cer = evaluator.score_pages(join_pages(outputs), join_pages(gt for _, gt in documents))["aggregate"]["cer"] * 100
+    return {
+        "pages": pages,
+        "image_mb_per_page": round(counters.get("ocr.image_bytes", 0) / pages / 1e6, 3),
+        "rasterize_ms_per_page": round(stage_seconds("pdf.rasterize", "pdf.rerender") / pages * 1000, 1),
+        "ocr_ms_per_page": round(stage_seconds("ocr.detect", "ocr.recognize", "ocr.rerecognize") / pages * 1000, 1),
+        "total_ms_per_page": round(seconds / pages * 1000, 1),
+        "rerendered_pages": counters.get("ocr.rerendered_pages", 0),
+        "rerecognized_lines": counters.get("ocr.rerecognized_lines", 0),
+        "cer": round(cer, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS), choices=list(CONFIGS))
+    parser.add_argument("--render-threads", type=int, default=None, help="poppler processes per page window")
+    parser.add_argument("--output", default=None, help="also write the report as JSON")
+    args = parser.parse_args()
+
+    documents = []
+    for pdf_path in sorted(glob.glob(os.path.join(PDF_DIR, "*.pdf"))):
+        ground_truth = ground_truth_for(pdf_path, GROUND_TRUTH_DIR)
+        if ground_truth is not None:
+            with open(pdf_path, "rb") as f:
+                documents.append((f.read(), ground_truth))
+    if not documents:
+        sys.exit("No PDFs with ground truth found")
+
+    report = {}
+    reference = None
+    for name in args.configs:
+        result = run_config(CONFIGS[name], documents, args.render_threads)
+        if reference is None:
+            reference = result
+        # Savings per page compared to the first configuration
+        result["image_mb_saved_per_page"] = round(reference["image_mb_per_page"] - result["image_mb_per_page"], 3)
+        result["ms_saved_per_page"] = round(reference["total_ms_per_page"] - result["total_ms_per_page"], 1)
+        result["cer_change"] = round(result["cer"] - reference["cer"], 3)
+        report[name] = result
+        print(f"{name:>17}: {result['image_mb_per_page']:6.2f} MB/page ({-result['image_mb_saved_per_page']:+.2f})  "
+              f"rasterize {result['rasterize_ms_per_page']:7.1f} ms  OCR {result['ocr_ms_per_page']:8.1f} ms  "
+              f"total {result['total_ms_per_page']:8.1f} ms/page ({-result['ms_saved_per_page']:+.1f})  "
+              f"CER {result['cer']:6.2f}% ({result['cer_change']:+.2f})  "
+              f"re-rendered {result['rerendered_pages']} page(s), {result['rerecognized_lines']} line(s)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Startup benchmark: import times, time to first render and model warm-up.
+
+Each measurement runs in a fresh interpreter so nothing is imported yet:
+    imports       - what app.py imports up front, and each module it defers
+                    (None when the module is not installed)
+    first_render  - one cold run of app.py under Streamlit's AppTest, until
+                    the page is rendered (skipped without streamlit)
+    warmup        - seconds until each engine of a JobWorker is ready
+
+    python -m benchmarks.startup_benchmark --save-baseline   # record benchmarks/startup_baseline.json
+    python -m benchmarks.startup_benchmark                   # compare; exits 1 on slowdowns
+    python -m benchmarks.startup_benchmark --no-warmup       # skip loading the models
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RESULTS_PATH = os.path.join("benchmarks", "startup.json")
+BASELINE_PATH = os.path.join("benchmarks", "startup_baseline.json")
+
+# What app.py imports before its first render
+APP_IMPORTS = ("streamlit", "src.braille_mapper", "src.jobs", "src.instrumentation", "src.cache", "src.exports")
+# Imported on first use only (export, evaluation, the job worker's engines)
+DEFERRED_IMPORTS = ("docx", "src.evaluator", "src.ocr_engine", "src.corrector", "easyocr", "transformers")
+
+_TIME_IMPORT = """
+import importlib, sys, time
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+print(time.perf_counter() - start)
+"""
+
+_TIME_FIRST_RENDER = """
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("app.py", default_timeout=120).run()
+assert not app.exception, app.exception
+print(time.perf_counter() - start)
+"""
+
+
+def run_timed(code, *args):
+    """Runs `code` in a fresh interpreter and returns the seconds it prints (None on failure)."""
+    process = subprocess.run([sys.executable, "-c", code, *args], cwd=ROOT, capture_output=True, text=True)
+    if process.returncode != 0:
+        return None
+    return round(float(process.stdout.strip().splitlines()[-1]), 4)
+
+
+def time_first_render():
+    from src.jobs import JobStore
+    # A placeholder worker keeps the app from starting a real one while it is measured
+    store = JobStore()
+    store.register_worker("startup-benchmark", os.getpid())
+    try:
+        return run_timed(_TIME_FIRST_RENDER)
+    finally:
+        store.unregister_worker("startup-benchmark")
+
+
+def time_warmup(timeout):
+    """Seconds until each engine of a fresh JobWorker is ready (None if it failed)."""
+    from src.jobs import JobStore, JobWorker, LOADING, READY
+
+    store = JobStore(os.path.join(tempfile.mkdtemp(prefix="startup_benchmark_"), "jobs.sqlite"))
+    worker = JobWorker(store)
+    start = time.perf_counter()
+    threading.Thread(target=worker.run, daemon=True).start()
+    engines = {}
+    while time.perf_counter() - start < timeout:
+        engines = store.engine_status()
+        if len(engines) == 2 and all(engine["status"] != LOADING for engine in engines.values()):
+            break
+        time.sleep(0.05)
+    worker.stop()
+    return {name: engine["seconds"] if engine["status"] == READY else None for name, engine in engines.items()}
+
+
+def compare(results, baseline, max_slowdown, min_seconds):
+    regressions = []
+
+    def check(label, current, base):
+        if current is not None and base is not None and base >= min_seconds and current > base * (1 + max_slowdown):
+            regressions.append(f"{label}: {current:.3f}s vs baseline {base:.3f}s "
+                               f"(+{current / base - 1:.0%}, limit +{max_slowdown:.0%})")
+
+    for name, seconds in results["imports"].items():
+        check(f"import {name}", seconds, baseline.get("imports", {}).get(name))
+    check("first render", results["first_render"], baseline.get("first_render"))
+    for name, seconds in results["warmup"].items():
+        check(f"warm-up {name}", seconds, baseline.get("warmup", {}).get(name))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=RESULTS_PATH, help="results JSON file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--max-slowdown", type=float, default=0.25, help="allowed fractional slowdown")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="ignore slowdowns of steps faster than this")
+    parser.add_argument("--no-warmup", action="store_true", help="skip the model warm-up measurement")
+    parser.add_argument("--warmup-timeout", type=float, default=600.0)
+    args = parser.parse_args()
+
+    results = {"imports": {}, "first_render": None, "warmup": {}}
+    results["imports"]["app"] = run_timed(_TIME_IMPORT, *APP_IMPORTS)
+    for name in DEFERRED_IMPORTS:
+        results["imports"][name] = run_timed(_TIME_IMPORT, name)
+    for name, seconds in results["imports"].items():
+        print(f"import {name:>18}: " + ("not available" if seconds is None else f"{seconds:8.3f}s"))
+
+    results["first_render"] = time_first_render()
+    print("first render:        " + ("skipped (needs streamlit)" if results["first_render"] is None
+                                     else f"{results['first_render']:8.3f}s"))
+
+    if not args.no_warmup:
+        results["warmup"] = time_warmup(args.warmup_timeout)
+        for name, seconds in results["warmup"].items():
+            print(f"warm-up {name:>12}: " + ("failed" if seconds is None else f"{seconds:8.3f}s"))
+
+    output_path = args.baseline if args.save_baseline else args.output
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output_path}")
+
+    if args.save_baseline:
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.max_slowdown, args.min_seconds)
+    if regressions:
+        print("REGRESSIONS:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,32 @@
+import codecs
+import re
+from src.contractions import GRADE1_INDICATOR, STANDALONE_LETTERS_OK, compile_rules, contract
+from src.instrumentation import span
+
+
+def _mask_non_ascii(error):
+    # Encoding error handler used to find digits: keeps one byte per character,
+    # b'0' for non-ASCII digits (superscripts, other scripts...) and b' ' otherwise
+    chars = error.object[error.start:error.end]
+    return "".join('0' if char.isdigit() else ' ' for char in chars), error.end
+
+codecs.register_error("braille-digit-mask", _mask_non_ascii)
+
+# bytes.translate table: ASCII digits -> b'1', everything else -> b'0'
+_DIGIT_MASK = bytes(0x31 if 0x30 <= b <= 0x39 else 0x30 for b in range(256))
+
+# Grade 2 words: ASCII letters, optionally joined by apostrophes (don't, it's)
+_WORD = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)*")
+
+
 class BrailleTranslator:
-    def __init__(self):
+    def __init__(self, grade=1):
+        if grade not in (1, 2):
+            raise ValueError(f"Unsupported braille grade: {grade}")
+        self.grade = grade
         self.number_sign = '⠼'
         self.cap_sign = '⠠'
-        
+
         # Standard Grade 1 Mapping
         self.map = {
             'a': '⠁', 'b': '⠃', 'c': '⠉', 'd': '⠙', 'e': '⠑',
@@ -14,39 +38,149 @@ class BrailleTranslator:
             '.': '⠲', '!': '⠖', '(': '⠶', ')': '⠶', '?': '⠦',
             '"': '⠶', "'": '⠄', '-': '⠤'
         }
-        
+
         # Numbers mapping (1-9, 0) -> (a-j)
         self.num_map = {
             '1': '⠁', '2': '⠃', '3': '⠉', '4': '⠙', '5': '⠑',
             '6': '⠋', '7': '⠛', '8': '⠓', '9': '⠊', '0': '⠚'
         }
 
+        # Compiled tables for str.translate. Capital sign and the unknown
+        # character fallback are baked into each entry; digits are handled run
+        # by run. ASCII is compiled up front, other characters on first sight.
+        self._char_table = {}
+        self._num_table = {}
+        self._compile_chars(map(chr, range(128)))
+
+        # Grade 2: contraction trie (built once per process) and memoised words
+        self._trie = compile_rules() if grade == 2 else None
+        self._word_cache = {}
+
+    def _translate_char(self, char):
+        # Output for one non-digit character, same rules as the original loop
+        if char.isdigit():
+            return char
+        prefix = ''
+        if char.isupper():
+            prefix = self.cap_sign
+            char = char.lower()
+        # Fallback for unknown characters: a space
+        return prefix + self.map.get(char, ' ')
+
+    def _compile_chars(self, chars):
+        for char in chars:
+            code = ord(char)
+            if code in self._char_table:
+                continue
+            if char.isdigit():
+                self._num_table[code] = self.num_map.get(char, '')
+            translated = self._translate_char(char)
+            # Single characters as ints keep str.translate on its fastest path
+            self._char_table[code] = ord(translated) if len(translated) == 1 else translated
+
     def translate(self, text):
+        with span("braille.translate", size=len(text), grade=self.grade):
+            if self.grade == 2:
+                return self._translate_grade2(text)
+            return self._translate_grade1(text)
+
+    def _translate_grade1(self, text):
+        if not text.isascii():
+            self._compile_chars(set(text))
+
+        # One byte per character, b'1' where the character is a digit
+        mask = text.encode("ascii", "braille-digit-mask").translate(_DIGIT_MASK)
+        start = mask.find(b'1')
+        if start < 0:
+            return text.translate(self._char_table)
+
         braille_output = []
-        is_number_mode = False
+        pos = 0
+        while start >= 0:
+            end = mask.find(b'0', start)
+            if end < 0:
+                end = len(text)
+            braille_output.append(text[pos:start].translate(self._char_table))
+            # One number sign per run of digits
+            braille_output.append(self.number_sign)
+            braille_output.append(text[start:end].translate(self._num_table))
+            pos = end
+            start = mask.find(b'1', end)
+        braille_output.append(text[pos:].translate(self._char_table))
+        return "".join(braille_output)
 
-        for char in text:
-            # Handle Numbers
-            if char.isdigit():
-                if not is_number_mode:
-                    braille_output.append(self.number_sign)
-                    is_number_mode = True
-                braille_output.append(self.num_map.get(char, ''))
-                continue
-            else:
-                is_number_mode = False
-
-            # Handle Capital Letters
-            if char.isupper():
-                braille_output.append(self.cap_sign)
-                char = char.lower()
-
-            # Handle Standard Mapping
-            if char in self.map:
-                braille_output.append(self.map[char])
-            else:
-                # Fallback for unknown characters to avoid '?' if possible
-                # We simply ignore or print a placeholder space
-                braille_output.append(' ') 
-                
-        return "".join(braille_output)
\ No newline at end of file
+    def _contract_word(self, word, standing_alone):
+        key = (word, standing_alone)
+        braille = self._word_cache.get(key)
+        if braille is not None:
+            return braille
+
+        lower = word.lower()
+        if word == lower:
+            prefix = ''
+        elif word[0] != lower[0] and word[1:] == lower[1:]:
+            prefix = self.cap_sign
+        elif word == word.upper():
+            # Capitalised word indicator
+            prefix = self.cap_sign * 2
+        else:
+            # Mixed case (e.g. "iPhone"): spell it out letter by letter
+            return self._translate_grade1(word)
+
+        if "'" in lower:
+            # The stem is contracted as a word of its own ("children's",
+            # "it's"); the suffix after the apostrophe is spelled out
+            stem, suffix = lower.split("'", 1)
+            braille = contract(stem, self.map, standing_alone, self._trie) + self.map["'"] + \
+                "".join(self.map[char] for char in suffix)
+        else:
+            braille = contract(lower, self.map, standing_alone, self._trie)
+            if standing_alone and len(lower) == 1 and lower not in STANDALONE_LETTERS_OK:
+                prefix = GRADE1_INDICATOR + prefix
+        braille = prefix + braille
+
+        if len(self._word_cache) > 100000:
+            self._word_cache.clear()
+        self._word_cache[key] = braille
+        return braille
+
+    def _translate_grade2(self, text):
+        """
+        Contracted braille: every word goes through the precompiled rule trie
+        in a single longest-match pass; everything between words is Grade 1.
+        """
+        braille_output = []
+        pos = 0
+        for match in _WORD.finditer(text):
+            start, end = match.span()
+            if start > pos:
+                braille_output.append(self._translate_grade1(text[pos:start]))
+            # Wordsigns only apply to words standing alone (not glued to digits)
+            standing_alone = not (
+                (start > 0 and text[start - 1].isdigit()) or
+                (end < len(text) and text[end].isdigit())
+            )
+            braille_output.append(self._contract_word(match.group(), standing_alone))
+            pos = end
+        braille_output.append(self._translate_grade1(text[pos:]))
+        return "".join(braille_output)
+
+    def translate_iter(self, chunks):
+        """
+        Translates an iterable of text chunks, yielding braille chunk by chunk,
+        so the whole document never has to be held twice.
+        A trailing run of letters/digits is held back until the next chunk, so
+        numbers and words are never split and the output is identical to
+        translate("".join(chunks)).
+        """
+        pending = ""
+        for chunk in chunks:
+            text = pending + chunk
+            cut = len(text)
+            while cut > 0 and (text[cut - 1].isalnum() or text[cut - 1] == "'"):
+                cut -= 1
+            pending = text[cut:]
+            if cut:
+                yield self.translate(text[:cut])
+        if pending:
+            yield self.translate(pending)
@@ -0,0 +1,192 @@
+import functools
+
+# --------------------------------------------------------------------------
+# Grade 2 (contracted) English braille rules, UEB subset.
+# Each rule is (letters, braille, position) where position is one of:
+#   "word"      - only when the letters are the whole word, standing alone
+#   "any"       - anywhere in a word
+#   "begin"     - at the beginning of a longer word
+#   "syllable"  - at the beginning, only where the letters form the first
+#                 syllable (see _first_syllable)
+#   "middle"    - with letters on both sides
+#   "not_begin" - anywhere but the beginning (middle or end)
+# --------------------------------------------------------------------------
+RULES = [
+    # Alphabetic wordsigns
+    ("but", "⠃", "word"), ("can", "⠉", "word"), ("do", "⠙", "word"),
+    ("every", "⠑", "word"), ("from", "⠋", "word"), ("go", "⠛", "word"),
+    ("have", "⠓", "word"), ("just", "⠚", "word"), ("knowledge", "⠅", "word"),
+    ("like", "⠇", "word"), ("more", "⠍", "word"), ("not", "⠝", "word"),
+    ("people", "⠏", "word"), ("quite", "⠟", "word"), ("rather", "⠗", "word"),
+    ("so", "⠎", "word"), ("that", "⠞", "word"), ("us", "⠥", "word"),
+    ("very", "⠧", "word"), ("will", "⠺", "word"), ("it", "⠭", "word"),
+    ("you", "⠽", "word"), ("as", "⠵", "word"),
+
+    # Strong contractions (whole word or part word)
+    ("and", "⠯", "any"), ("for", "⠿", "any"), ("of", "⠷", "any"),
+    ("the", "⠮", "any"), ("with", "⠾", "any"),
+
+    # Strong wordsigns
+    ("child", "⠡", "word"), ("shall", "⠩", "word"), ("this", "⠹", "word"),
+    ("which", "⠱", "word"), ("out", "⠳", "word"), ("still", "⠌", "word"),
+
+    # Strong groupsigns
+    ("ch", "⠡", "any"), ("gh", "⠣", "any"), ("sh", "⠩", "any"),
+    ("th", "⠹", "any"), ("wh", "⠱", "any"), ("ed", "⠫", "any"),
+    ("er", "⠻", "any"), ("ou", "⠳", "any"), ("ow", "⠪", "any"),
+    ("st", "⠌", "any"), ("ar", "⠜", "any"), ("ing", "⠬", "not_begin"),
+
+    # Lower wordsigns
+    ("be", "⠆", "word"), ("enough", "⠢", "word"), ("were", "⠶", "word"),
+    ("his", "⠦", "word"), ("in", "⠔", "word"), ("was", "⠴", "word"),
+
+    # Lower groupsigns
+    ("be", "⠆", "syllable"), ("con", "⠒", "syllable"), ("dis", "⠲", "syllable"),
+    ("ea", "⠂", "middle"), ("bb", "⠆", "middle"), ("cc", "⠒", "middle"),
+    ("ff", "⠖", "middle"), ("gg", "⠶", "middle"),
+    ("en", "⠢", "any"), ("in", "⠔", "any"),
+
+    # Initial-letter contractions
+    ("day", "⠐⠙", "any"), ("ever", "⠐⠑", "any"), ("father", "⠐⠋", "any"),
+    ("here", "⠐⠓", "any"), ("know", "⠐⠅", "any"), ("lord", "⠐⠇", "any"),
+    ("mother", "⠐⠍", "any"), ("name", "⠐⠝", "any"), ("one", "⠐⠕", "any"),
+    ("part", "⠐⠏", "any"), ("question", "⠐⠟", "any"), ("right", "⠐⠗", "any"),
+    ("some", "⠐⠎", "any"), ("time", "⠐⠞", "any"), ("under", "⠐⠥", "any"),
+    ("work", "⠐⠺", "any"), ("young", "⠐⠽", "any"), ("there", "⠐⠮", "any"),
+    ("character", "⠐⠡", "any"), ("through", "⠐⠹", "any"), ("where", "⠐⠱", "any"),
+    ("ought", "⠐⠳", "any"),
+    ("upon", "⠘⠥", "any"), ("these", "⠘⠮", "any"), ("those", "⠘⠹", "any"),
+    ("whose", "⠘⠱", "any"), ("word", "⠘⠺", "any"),
+    ("cannot", "⠸⠉", "any"), ("had", "⠸⠓", "any"), ("many", "⠸⠍", "any"),
+    ("spirit", "⠸⠎", "any"), ("their", "⠸⠮", "any"), ("world", "⠸⠺", "any"),
+
+    # Final-letter groupsigns
+    ("ound", "⠨⠙", "not_begin"), ("ance", "⠨⠑", "not_begin"), ("sion", "⠨⠝", "not_begin"),
+    ("less", "⠨⠎", "not_begin"), ("ount", "⠨⠞", "not_begin"),
+    ("ence", "⠰⠑", "not_begin"), ("ong", "⠰⠛", "not_begin"), ("ful", "⠰⠇", "not_begin"),
+    ("tion", "⠰⠝", "not_begin"), ("ness", "⠰⠎", "not_begin"), ("ment", "⠰⠞", "not_begin"),
+    ("ity", "⠰⠽", "not_begin"),
+
+    # Shortforms
+    ("about", "⠁⠃", "word"), ("above", "⠁⠃⠧", "word"), ("according", "⠁⠉", "word"),
+    ("across", "⠁⠉⠗", "word"), ("after", "⠁⠋", "word"), ("afternoon", "⠁⠋⠝", "word"),
+    ("again", "⠁⠛", "word"), ("against", "⠁⠛⠌", "word"), ("almost", "⠁⠇⠍", "word"),
+    ("already", "⠁⠇⠗", "word"), ("also", "⠁⠇", "word"), ("although", "⠁⠇⠹", "word"),
+    ("altogether", "⠁⠇⠞", "word"), ("always", "⠁⠇⠺", "word"), ("because", "⠆⠉", "word"),
+    ("before", "⠆⠋", "word"), ("behind", "⠆⠓", "word"), ("below", "⠆⠇", "word"),
+    ("beneath", "⠆⠝", "word"), ("beside", "⠆⠎", "word"), ("between", "⠆⠞", "word"),
+    ("beyond", "⠆⠽", "word"), ("blind", "⠃⠇", "word"), ("braille", "⠃⠗⠇", "word"),
+    ("children", "⠡⠝", "word"), ("conceive", "⠒⠉⠧", "word"), ("could", "⠉⠙", "word"),
+    ("deceive", "⠙⠉⠧", "word"), ("declare", "⠙⠉⠇", "word"), ("either", "⠑⠊", "word"),
+    ("first", "⠋⠌", "word"), ("friend", "⠋⠗", "word"), ("good", "⠛⠙", "word"),
+    ("great", "⠛⠗⠞", "word"), ("herself", "⠓⠻⠋", "word"), ("him", "⠓⠍", "word"),
+    ("himself", "⠓⠍⠋", "word"), ("immediate", "⠊⠍⠍", "word"), ("its", "⠭⠎", "word"),
+    ("itself", "⠭⠋", "word"), ("letter", "⠇⠗", "word"), ("little", "⠇⠇", "word"),
+    ("much", "⠍⠡", "word"), ("must", "⠍⠌", "word"), ("myself", "⠍⠽⠋", "word"),
+    ("necessary", "⠝⠑⠉", "word"), ("neither", "⠝⠑⠊", "word"), ("oneself", "⠐⠕⠋", "word"),
+    ("ourselves", "⠳⠗⠧⠎", "word"), ("paid", "⠏⠙", "word"), ("perceive", "⠏⠻⠉⠧", "word"),
+    ("perhaps", "⠏⠻⠓", "word"), ("quick", "⠟⠅", "word"), ("receive", "⠗⠉⠧", "word"),
+    ("rejoice", "⠗⠚⠉", "word"), ("said", "⠎⠙", "word"), ("should", "⠩⠙", "word"),
+    ("such", "⠎⠡", "word"), ("themselves", "⠮⠍⠧⠎", "word"), ("thyself", "⠹⠽⠋", "word"),
+    ("today", "⠞⠙", "word"), ("together", "⠞⠛⠗", "word"), ("tomorrow", "⠞⠍", "word"),
+    ("tonight", "⠞⠝", "word"), ("would", "⠺⠙", "word"), ("your", "⠽⠗", "word"),
+    ("yourself", "⠽⠗⠋", "word"), ("yourselves", "⠽⠗⠧⠎", "word"),
+]
+
+# Letters that need the grade 1 indicator when standing alone, so they are
+# not read as the wordsign they share a cell with
+GRADE1_INDICATOR = "⠰"
+STANDALONE_LETTERS_OK = frozenset("aio")
+
+# Key under which a trie node stores the rules ending at that node
+_RULES_KEY = ""
+
+_VOWELS = frozenset("aeiouy")
+# "dis" followed by these letters is not the first syllable ("dish", "dishes"),
+# unless the word goes on as in _DIS_SYLLABLE ("dishonest")
+_DIS_NOT_SYLLABLE = ("dish",)
+_DIS_SYLLABLE = ("dishon", "dishear", "dishev")
+
+
+def _first_syllable(word, end):
+    """
+    Whether word[:end] ("be", "con" or "dis") is the word's first syllable,
+    judged from the spelling: the rest must contain a vowel, "be" must be
+    followed by a consonant and a vowel (become, not bed / bee / best / bell)
+    or by "ing", and "con" by a consonant (concern, not cone).
+    """
+    rest = word[end:]
+    if not _VOWELS.intersection(rest):
+        return False
+    prefix = word[:end]
+    if prefix == "be":
+        return rest in ("ing", "ings") or (len(rest) > 1 and rest[0] not in _VOWELS and rest[1] in _VOWELS)
+    if prefix == "con":
+        return rest[0] not in _VOWELS
+    if prefix == "dis":
+        return not word.startswith(_DIS_NOT_SYLLABLE) or word.startswith(_DIS_SYLLABLE)
+    return True
+
+
+def _allowed(position, start, end, length, whole_word, word):
+    if position == "any":
+        return True
+    if position == "word":
+        return whole_word and start == 0 and end == length
+    if position == "begin":
+        return start == 0 and end < length
+    if position == "syllable":
+        return start == 0 and end < length and _first_syllable(word, end)
+    if position == "middle":
+        return start > 0 and end < length
+    if position == "not_begin":
+        return start > 0
+    return False
+
+
+@functools.lru_cache(maxsize=None)
+def compile_rules(rules=tuple(RULES)):
+    """
+    Builds the letter trie for a rule table once per process.
+    Each node is a dict of child nodes keyed by letter; the rules ending at a
+    node are stored under "" in table order.
+    """
+    trie = {}
+    for letters, braille, position in rules:
+        node = trie
+        for letter in letters:
+            node = node.setdefault(letter, {})
+        node.setdefault(_RULES_KEY, []).append((braille, position))
+    return trie
+
+
+def contract(word, letter_map, whole_word, trie=None):
+    """
+    Translates one lowercase ASCII word in a single left-to-right pass,
+    taking the longest rule allowed at each position and falling back to the
+    letter's Grade 1 cell.
+    """
+    trie = trie if trie is not None else compile_rules()
+    output = []
+    length = len(word)
+    i = 0
+    while i < length:
+        best_end, best_braille = 0, None
+        node = trie
+        j = i
+        while j < length:
+            node = node.get(word[j])
+            if node is None:
+                break
+            j += 1
+            for braille, position in node.get(_RULES_KEY, ()):
+                if _allowed(position, i, j, length, whole_word, word):
+                    best_end, best_braille = j, braille
+                    break
+        if best_braille is None:
+            output.append(letter_map[word[i]])
+            i += 1
+        else:
+            output.append(best_braille)
+            i = best_end
+    return "".join(output)
@@ -1,15 +1,100 @@
-from transformers import pipeline
+from src.cache import SQLiteCache, make_key
+from src.instrumentation import count, span
+from src.symspell import SymSpell
+import inspect
+import os
 
 class TextCorrector:
     # Grammar correction using a T5 model via HuggingFace Transformers
-    def __init__(self):
-        self.corrector = pipeline(
-            "text2text-generation",
-            model="vennify/t5-base-grammar-correction", 
-            max_length=512
-        )
+    MODEL_NAME = "vennify/t5-base-grammar-correction"
+    # Inference backends:
+    #   "pytorch" - stock transformers model
+    #   "int8"    - PyTorch with Linear layers dynamically quantized to int8 (CPU)
+    #   "onnx"    - ONNX Runtime via optimum (model_dir must hold an exported model,
+    #               see export_onnx())
+    BACKENDS = ("pytorch", "int8", "onnx")
+    # Correction tiers, applied in order:
+    #   "symspell" - dictionary spelling correction per token (microseconds, see src/symspell.py)
+    #   "t5"       - the transformer; after "symspell" it only sees lines that still look damaged
+    TIERS = ("symspell", "t5")
+    # "symspell" is opt-in until benchmarks.correction_tiers shows it does not
+    # lower accuracy on real documents
+    DEFAULT_TIERS = ("t5",)
+    GENERATION_SETTINGS = {"max_length": 512}
+
+    def __init__(self, batch_size=8, cache_path=os.path.join(".cache", "corrections.sqlite"),
+                 cache_max_bytes=256 * 1024 * 1024, backend="pytorch", model_dir=None,
+                 confidence_threshold=0.9, tiers=DEFAULT_TIERS, max_unknown_ratio=0.15):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown corrector backend {backend!r}; expected one of {self.BACKENDS}")
+        if not tiers or any(tier not in self.TIERS for tier in tiers):
+            raise ValueError(f"Unknown correction tiers {tiers!r}; expected some of {self.TIERS}")
+        self.tiers = tuple(tiers)
+        self.backend = backend
+        # Local model directory (loaded without network access); None = download MODEL_NAME
+        self.model_dir = model_dir
+        self.generation_settings = dict(self.GENERATION_SETTINGS)
+        # The model is only loaded when its tier is used
+        self.corrector = self._load_pipeline() if "t5" in self.tiers else None
+        self.speller = SymSpell() if "symspell" in self.tiers else None
+        # After the dictionary pass, lines with more unknown words than this go to the model
+        self.max_unknown_ratio = max_unknown_ratio
         # Using a conservative character limit well below the 512 token limit
         self.max_char_chunk = 450 
+        # Number of lines/chunks sent through the model in one generate call
+        self.batch_size = batch_size
+        # Persistent cache of model outputs (None disables it)
+        self.cache = SQLiteCache(cache_path, cache_max_bytes) if cache_path else None
+        # OCR regions at or above this EasyOCR confidence are kept as they are
+        # (None sends every line through the model)
+        self.confidence_threshold = confidence_threshold
+        # Regions with a known confidence seen / kept without the model, since startup
+        self.regions_seen = 0
+        self.regions_skipped = 0
+
+    def _load_pipeline(self):
+        # Imported here: transformers (and torch) take seconds to import and
+        # the dictionary-only tier never needs them
+        from transformers import pipeline
+        if self.backend == "pytorch" and self.model_dir is None:
+            return pipeline(
+                "text2text-generation",
+                model=self.MODEL_NAME, 
+                **self.generation_settings
+            )
+
+        from transformers import AutoTokenizer
+        source = self.model_dir or self.MODEL_NAME
+        local = {"local_files_only": True} if self.model_dir else {}
+        tokenizer = AutoTokenizer.from_pretrained(source, **local)
+
+        if self.backend == "onnx":
+            # Optional dependency: pip install optimum[onnxruntime]
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+            model = ORTModelForSeq2SeqLM.from_pretrained(source, **local)
+        else:
+            import torch
+            from transformers import AutoModelForSeq2SeqLM
+            model = AutoModelForSeq2SeqLM.from_pretrained(source, **local)
+            model.eval()
+            if self.backend == "int8":
+                model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        return pipeline("text2text-generation", model=model, tokenizer=tokenizer, **self.generation_settings)
+
+    @classmethod
+    def export_onnx(cls, model_dir, source=None):
+        """
+        Exports the model (MODEL_NAME or a local `source` directory) to ONNX
+        with its tokenizer in `model_dir`, for backend="onnx". Needs network
+        access only when `source` is not local.
+        """
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        from transformers import AutoTokenizer
+        source = source or cls.MODEL_NAME
+        ORTModelForSeq2SeqLM.from_pretrained(source, export=True).save_pretrained(model_dir)
+        AutoTokenizer.from_pretrained(source).save_pretrained(model_dir)
+        return model_dir
 
     def _chunk_text(self, text):
         """Splits a long string into chunks of max_char_chunk size."""
@@ -37,49 +122,228 @@ class TextCorrector:
         return [c for c in chunks if c] # Filter out empty chunks
 
     def _run_model(self, text_chunk):
-        """Helper to run the actual prediction"""
+        """Helper to run the actual prediction for one chunk; None if the model fails"""
         try:
             input_text = "grammar: " + text_chunk
             res = self.corrector(input_text)
             return res[0]['generated_text']
         except Exception as e:
-            # Fallback if model fails
-            return text_chunk
+            return None
+
+    def _run_model_batch(self, text_chunks):
+        """
+        Runs a batch of chunks through the model in one call.
+        Returns the generated text per chunk, or None where the model failed.
+        """
+        try:
+            inputs = ["grammar: " + chunk for chunk in text_chunks]
+            res = self.corrector(inputs, batch_size=len(inputs))
+            # The pipeline returns either [{...}] or {...} per input
+            return [r[0]['generated_text'] if isinstance(r, list) else r['generated_text'] for r in res]
+        except Exception as e:
+            # Fallback: run the chunks one by one
+            return [self._run_model(chunk) for chunk in text_chunks]
+
+    def _cache_key(self, text_chunk):
+        # Same chunk + same model (or local model directory) + same backend + same
+        # generation settings -> same output
+        return make_key(self.MODEL_NAME, self.model_dir, self.backend, self.generation_settings,
+                        "grammar: " + text_chunk)
+
+    def settings_key(self):
+        # Everything besides the input that changes correct_pages() output
+        return make_key(self.MODEL_NAME, self.model_dir, self.backend, self.generation_settings, self.tiers,
+                        self.confidence_threshold, self.max_unknown_ratio)
+
+    @classmethod
+    def options_key(cls, **options):
+        """settings_key() of TextCorrector(**options), without loading anything."""
+        bound = inspect.signature(cls.__init__).bind(None, **options)
+        bound.apply_defaults()
+        settings = bound.arguments
+        return make_key(cls.MODEL_NAME, settings["model_dir"], settings["backend"], cls.GENERATION_SETTINGS,
+                        tuple(settings["tiers"]), settings["confidence_threshold"], settings["max_unknown_ratio"])
+
+    def _generate(self, text_chunks, batch_size, progress_callback=None):
+        """
+        Returns {chunk: generated text} for the given unique chunks.
+        Cached outputs are reused; only the misses go through the model,
+        grouped by token length. Failed generations are left out.
+        """
+        generated = {}
+        keys = {}
+        if self.cache is not None:
+            keys = {chunk: self._cache_key(chunk) for chunk in text_chunks}
+            with span("correct.cache_lookup", size=len(keys)):
+                cached = self.cache.get_many(keys.values())
+            for chunk, key in keys.items():
+                if key in cached:
+                    generated[chunk] = cached[key]
+            count("correct.cache_hits", len(generated))
+        pending = [chunk for chunk in text_chunks if chunk not in generated]
+        count("correct.model_chunks", len(pending))
+
+        # Sort by token length so each batch pads to a similar length
+        lengths = self._token_lengths(pending) if pending else []
+        order = sorted(range(len(pending)), key=lambda k: lengths[k])
+
+        done = len(generated)
+        for start in range(0, len(order), batch_size):
+            batch = [pending[k] for k in order[start:start + batch_size]]
+            new_outputs = {}
+            count("correct.model_calls")
+            # Batches are length-sorted, so the last chunk is the longest
+            with span("correct.generate", size=len(batch), max_tokens=lengths[order[start + len(batch) - 1]]):
+                outputs = self._run_model_batch(batch)
+            for chunk, output in zip(batch, outputs):
+                if output is not None:
+                    new_outputs[chunk] = output
+            generated.update(new_outputs)
+            if self.cache is not None:
+                self.cache.set_many({keys[chunk]: output for chunk, output in new_outputs.items()})
+            done += len(batch)
+            if progress_callback is not None:
+                progress_callback(done, len(text_chunks))
+        if not pending and text_chunks and progress_callback is not None:
+            progress_callback(done, len(text_chunks))
+        return generated
+
+    def _token_lengths(self, texts):
+        # Token counts are what padding cost depends on; fall back to characters
+        try:
+            return [len(ids) for ids in self.corrector.tokenizer(texts)["input_ids"]]
+        except Exception as e:
+            return [len(t) for t in texts]
+
+    def _confident_lines(self, page, page_regions):
+        """
+        Returns (lines with a known confidence, lines at or above the threshold)
+        for one page, matching OCR regions to lines by their text.
+        """
+        if page_regions is None or self.confidence_threshold is None:
+            return 0, set()
+        confidences = {}
+        for region in page_regions:
+            text = region["text"].strip()
+            # The same text in several regions: trust the least confident one
+            confidences[text] = min(region["confidence"], confidences.get(text, 1.0))
+        lines = [line.strip() for line in page.split('\n') if line.strip() in confidences]
+        return len(lines), {line for line in lines if confidences[line] >= self.confidence_threshold}
+
+    def correct_pages(self, pages, batch_size=None, progress_callback=None, regions=None, stats=None, sources=None):
+        """
+        Corrects a whole document at once.
+        Every line/chunk across all pages is collected, looked up in the
+        persistent cache, and the misses are grouped by similar token length and
+        run through the model in batches; results are put back in their original
+        order. Returns the corrected text of each page.
+        `regions` (per page, as yielded by OCREngine.iter_pages) enables
+        confidence gating: lines EasyOCR was sure about skip the model.
+        `sources` (per page, likewise) marks "text_layer" pages, whose text is
+        exact and kept as it is.
+        `stats`, if given, is a dict whose "regions" / "skipped" / "text_layer_pages"
+        counts are increased.
+        `progress_callback(done, total)` is called after every batch.
+        """
+        batch_size = max(1, batch_size or self.batch_size)
+
+        # 1. Text-layer pages and the lines the recognizer was confident about
+        #    are kept as they are
+        sources = sources or [None] * len(pages)
+        gated = [(0, {line.strip() for line in page.split('\n')}) if source == "text_layer"
+                 else self._confident_lines(page, page_regions)
+                 for page, page_regions, source in zip(pages, regions or [None] * len(pages), sources)]
+        confident = [lines for _, lines in gated]
+        seen = sum(known for known, _ in gated)
+        skipped = sum(1 for page, lines, source in zip(pages, confident, sources) if source != "text_layer"
+                      for line in page.split('\n') if line.strip() in lines)
+        text_layer_pages = sources.count("text_layer")
+        self.regions_seen += seen
+        self.regions_skipped += skipped
+        count("correct.regions", seen)
+        count("correct.regions_skipped", skipped)
+        count("correct.text_layer_pages", text_layer_pages)
+        if stats is not None:
+            stats["regions"] = stats.get("regions", 0) + seen
+            stats["skipped"] = stats.get("skipped", 0) + skipped
+            stats["text_layer_pages"] = stats.get("text_layer_pages", 0) + text_layer_pages
+
+        # 2. Dictionary tier, then decide per line: None (blank), (text, False)
+        #    to keep as is, or (text, True) to send through the model
+        plans = []
+        dictionary_lines = 0
+        for page, lines in zip(pages, confident):
+            plan = []
+            for line in page.split('\n'):
+                line = line.strip()
+                if not line:
+                    plan.append(None)
+                elif line in lines:
+                    plan.append((line, False))
+                elif self.speller is not None:
+                    with span("correct.dictionary", size=len(line)):
+                        fixed, unknown_ratio = self.speller.correct_line(line)
+                    # Only lines that still look damaged go on to the transformer
+                    damaged = "t5" in self.tiers and unknown_ratio > self.max_unknown_ratio
+                    dictionary_lines += not damaged
+                    plan.append((fixed, damaged))
+                else:
+                    plan.append((line, "t5" in self.tiers))
+            plans.append(plan)
+        count("correct.dictionary_lines", dictionary_lines)
+        if stats is not None:
+            stats["dictionary_lines"] = stats.get("dictionary_lines", 0) + dictionary_lines
+
+        # 3. Chunk the model lines by character length and collect the unique
+        #    chunks (repeated headers/footers run only once)
+        layouts = [
+            [self._chunk_text(line[0]) if line and line[1] and len(line[0]) > self.max_char_chunk
+             else [line[0]] if line and line[1] else None
+             for line in plan]
+            for plan in plans
+        ]
+        unique_chunks = list(dict.fromkeys(
+            chunk for layout in layouts for chunks in layout if chunks for chunk in chunks
+        ))
+
+        # 4. Generate (cache first, then length-bucketed batches), keeping the
+        #    length-guard fallback
+        generated = self._generate(unique_chunks, batch_size, progress_callback) if unique_chunks else {}
+        corrections = {}
+        for chunk in unique_chunks:
+            corrected_chunk = generated.get(chunk, chunk)
+            if len(corrected_chunk) <= len(chunk) + 5:
+                corrections[chunk] = corrected_chunk
+            else:
+                corrections[chunk] = chunk
+
+        # 5. Rebuild every page in its original line order
+        corrected_pages = []
+        for plan, layout in zip(plans, layouts):
+            corrected_lines = []
+            for line, chunks in zip(plan, layout):
+                if line is None:
+                    corrected_lines.append("")
+                elif chunks is None:
+                    corrected_lines.append(line[0])
+                else:
+                    # Join the corrected chunks back together (using a space)
+                    corrected_lines.append(" ".join(corrections[chunk] for chunk in chunks))
+            corrected_pages.append("\n".join(corrected_lines))
+        return corrected_pages
 
     def correct_text(self, text):
         """
         Splits text into lines (paragraphs) and then further chunks them 
         by character length before correcting.
         """
-        # 1. Split text by existing paragraphs/lines from OCR
-        lines = text.split('\n')
-        corrected_lines = []
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                corrected_lines.append("")
-                continue
-
-            # 2. Chunk the line if it's too long
-            if len(line) > self.max_char_chunk:
-                chunks = self._chunk_text(line)
-                corrected_chunks = []
-                for chunk in chunks:
-                    corrected_chunk = self._run_model(chunk)
-                    if len(corrected_chunk) <= len(chunk) + 5:
-                        corrected_chunks.append(corrected_chunk)
-                    else:
-                        corrected_chunks.append(chunk)
-                
-                # Join the corrected chunks back together (using a space)
-                corrected_lines.append(" ".join(corrected_chunks))
-            else:
-                # Process shorter lines directly
-                corrected_line = self._run_model(line)
-                if len(corrected_line) <= len(line) + 5:
-                    corrected_lines.append(corrected_line)
-                else:
-                    corrected_lines.append(line)
-                
-        return "\n".join(corrected_lines)
\ No newline at end of file
+        return self.correct_pages([text])[0]
+
+    def gating_stats(self):
+        """Confidence gating since startup: regions with a confidence, and how many skipped the model"""
+        return {"regions": self.regions_seen, "skipped": self.regions_skipped,
+                "skip_rate": self.regions_skipped / self.regions_seen if self.regions_seen else 0.0}
+
+    def cache_stats(self):
+        """Hit/miss counters of the correction cache (None when disabled)"""
+        return self.cache.stats() if self.cache is not None else None
@@ -1,100 +1,142 @@
 # src/evaluator.py
-import numpy as np
 import Levenshtein
-import nltk
-from nltk.metrics.distance import edit_distance
-import re 
-
-# --------------------------------------------------------------------------
-# FIX: Robust download logic to handle environmental path issues
-# --------------------------------------------------------------------------
-try:
-    # 1. Check if the resource is already available in this environment's path
-    nltk.data.find('corpora/wordnet')
-except LookupError:
-    print("NLTK resource 'wordnet' not found in the Streamlit environment's paths.")
-    print("Attempting to download 'wordnet' now...")
-    try:
-        # 2. Attempt to download directly into the environment path
-        # Using quiet=True to suppress standard output during the run
-        nltk.download('wordnet', quiet=True) 
-        print("'wordnet' successfully downloaded for this environment.")
-    except Exception as e:
-        # 3. Catch any failure (network, permission, or AttributeError)
-        print(f"FATAL NLTK DOWNLOAD ERROR: {e}")
-        print("The automatic NLTK download failed. Please ensure your network is connected and that you have run 'python -c \"import nltk; nltk.download(\\'wordnet\\')\"' in your terminal.")
-        # Re-raise the LookupError so the app does not run with a broken component
-        raise
-# --------------------------------------------------------------------------
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+# Pages are joined with "\n\n-- Page Break --\n\n" by the app
+PAGE_BREAK_PATTERN = re.compile(r'\s*-- Page Break --\s*')
+
+
+def normalize_for_cer(text):
+    # Convert to lower case
+    text = text.lower()
+    # Remove all non-alphanumeric characters, and keep spaces temporarily
+    text = re.sub(r'[^\w\s]', '', text)
+    # Remove all remaining whitespace (tabs, newlines, spaces)
+    return ''.join(text.split())
+
+
+def normalize_for_wer(text):
+    # Same cleanup as CER, but keeps the words apart
+    return re.sub(r'[^\w\s]', '', text.lower()).split()
+
+
+def normalize_for_accuracy(text):
+    # Removing extra whitespace ensures accuracy isn't penalized for layout differences.
+    return " ".join(text.split()).lower()
+
+
+def score_page(pair):
+    """
+    Raw edit counts for one (predicted, ground truth) page pair.
+    Module level so it can run in a worker process.
+    All distances use the C Levenshtein implementation (linear memory).
+    """
+    predicted_text, ground_truth_text = pair
+
+    predicted_chars = normalize_for_cer(predicted_text)
+    ground_truth_chars = normalize_for_cer(ground_truth_text)
+    predicted_words = normalize_for_wer(predicted_text)
+    ground_truth_words = normalize_for_wer(ground_truth_text)
+    predicted_clean = normalize_for_accuracy(predicted_text)
+    ground_truth_clean = normalize_for_accuracy(ground_truth_text)
+
+    return {
+        "cer_edits": Levenshtein.distance(predicted_chars, ground_truth_chars),
+        "cer_length": len(ground_truth_chars),
+        "wer_edits": Levenshtein.distance(predicted_words, ground_truth_words),
+        "wer_length": len(ground_truth_words),
+        "accuracy_edits": Levenshtein.distance(ground_truth_clean, predicted_clean),
+        "accuracy_length": len(ground_truth_clean),
+        "accuracy_empty_prediction": not predicted_clean,
+    }
+
+
+def _rates(counts):
+    # Error rates from (summed) edit counts, same edge cases as the single-text metrics
+    cer = counts["cer_edits"] / counts["cer_length"] if counts["cer_length"] else 0.0
+    wer = counts["wer_edits"] / counts["wer_length"] if counts["wer_length"] else 0.0
+    if counts["accuracy_length"]:
+        accuracy = (1.0 - counts["accuracy_edits"] / counts["accuracy_length"]) * 100
+    else:
+        accuracy = 100.0 if counts["accuracy_empty_prediction"] else 0.0
+    return {"cer": cer, "wer": wer, "character_accuracy": accuracy}
 
 
 class Evaluator:
 
+    def __init__(self, workers=None, parallel_min_pages=8):
+        # Worker processes for page scoring (None = one per CPU)
+        self.workers = workers or os.cpu_count() or 1
+        # Small documents are scored in-process; a pool costs more than it saves
+        self.parallel_min_pages = parallel_min_pages
+
     def calculate_char_accuracy(self, ground_truth : str, corrected_text : str) -> float:
         """
         Calculates Character Accuracy between ground truth and corrected text.
         """
-        # 1. Normalize the strings (important for fair comparison)
-        # Removing extra whitespace ensures accuracy isn't penalized for layout differences.
-        gt_clean = " ".join(ground_truth.split()).lower()
-        ocr_clean = " ".join(corrected_text.split()).lower()
-
-        # If the ground truth is empty, handle the edge case
-        if not gt_clean:
-            return 0.0 if ocr_clean else 100.0
-        
-        # 2. Calculate Levenshtein Distance (Number of Edits)
-        # The distance is the minimum number of insertions, deletions, or substitutions.
-        edit_distance = Levenshtein.distance(gt_clean, ocr_clean)
-        
-        # 3. Calculate CER
-        # CER = (Edits / Total Characters in Ground Truth)
-        cer = edit_distance / len(gt_clean)
-        
-        # 4. Convert CER to Accuracy Percentage
-        # Accuracy = (1 - CER) * 100
-        accuracy_rate = (1.0 - cer) * 100
-        
-        return accuracy_rate
+        return _rates(score_page((corrected_text, ground_truth)))["character_accuracy"]
 
     def calculate_cer(self, predicted_text: str, ground_truth_text: str) -> float:
         """
         Calculates the Character Error Rate (CER).
         """
-        
-        # 1. Clean and normalize the text (Crucial step for fair comparison)
-        def normalize_text(text):
-            # Convert to lower case
-            text = text.lower()
-            # Remove all non-alphanumeric characters, and keep spaces temporarily
-            text = re.sub(r'[^\w\s]', '', text) 
-            # Remove all remaining whitespace (tabs, newlines, spaces) 
-            text = ''.join(text.split())
-            return text
-
-        normalized_predicted = normalize_text(predicted_text)
-        normalized_ground_truth = normalize_text(ground_truth_text)
-
-        if not normalized_ground_truth:
-            return 0.0
-
-        # 2. Calculate Levenshtein Distance (Edit Distance)
-        edits = edit_distance(normalized_predicted, normalized_ground_truth)
-        
-        # 3. Calculate CER
-        cer = edits / len(normalized_ground_truth)
-        
-        return cer
+        return _rates(score_page((predicted_text, ground_truth_text)))["cer"]
+
+    def calculate_wer(self, predicted_text: str, ground_truth_text: str) -> float:
+        """
+        Calculates the Word Error Rate (WER).
+        """
+        return _rates(score_page((predicted_text, ground_truth_text)))["wer"]
+
+    def score_pages(self, predicted_text: str, ground_truth_text: str) -> dict:
+        """
+        Scores a document page by page (split on the "-- Page Break --" markers),
+        in parallel for long documents.
+        Pages are paired only when both texts have the same number of pages;
+        otherwise the whole document is scored as one page.
+        Returns {"paired": bool, "pages": [...], "aggregate": {...}} where the
+        aggregate rates are total edits over total ground-truth length.
+        """
+        predicted_pages = PAGE_BREAK_PATTERN.split(predicted_text)
+        ground_truth_pages = PAGE_BREAK_PATTERN.split(ground_truth_text)
+
+        paired = len(predicted_pages) == len(ground_truth_pages)
+        if paired:
+            pairs = list(zip(predicted_pages, ground_truth_pages))
+        else:
+            pairs = [(predicted_text, ground_truth_text)]
+
+        if self.workers > 1 and len(pairs) >= self.parallel_min_pages:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(pairs))) as pool:
+                page_counts = list(pool.map(score_page, pairs, chunksize=max(1, len(pairs) // (self.workers * 4))))
+        else:
+            page_counts = [score_page(pair) for pair in pairs]
+
+        pages = []
+        for index, counts in enumerate(page_counts):
+            page = _rates(counts)
+            page["page"] = index + 1
+            page["ground_truth_chars"] = counts["cer_length"]
+            pages.append(page)
+
+        totals = {key: sum(counts[key] for counts in page_counts)
+                  for key in ("cer_edits", "cer_length", "wer_edits", "wer_length", "accuracy_edits", "accuracy_length")}
+        totals["accuracy_empty_prediction"] = all(counts["accuracy_empty_prediction"] for counts in page_counts)
+
+        return {"paired": paired, "pages": pages, "aggregate": _rates(totals)}
 
     def get_accuracy_report(self, corrected_text, ground_truth_text) -> dict:
         """Generates a full evaluation report."""
-        corrected_cer = self.calculate_cer(corrected_text, ground_truth_text)
-        
-        character_accuracy = self.calculate_char_accuracy(ground_truth_text, corrected_text)
-            
+        scores = self.score_pages(corrected_text, ground_truth_text)
+        aggregate = scores["aggregate"]
+
         return {
-            "corrected_cer": corrected_cer * 100,
-            "character_accuracy": character_accuracy,
+            "corrected_cer": aggregate["cer"] * 100,
+            "corrected_wer": aggregate["wer"] * 100,
+            "character_accuracy": aggregate["character_accuracy"],
             # "improvement_percent": improvement,
-            "raw_length": len(''.join(ground_truth_text.split()))
-        }
\ No newline at end of file
+            "raw_length": len(''.join(ground_truth_text.split())),
+            "pages": scores["pages"] if scores["paired"] else [],
+        }
@@ -0,0 +1,176 @@
+import io
+
+from src.instrumentation import span
+from src.postprocess import PAGE_BREAK
+
+# North American braille ASCII: the character for each 6-dot cell, indexed by
+# the cell's offset from U+2800 (bit 0 = dot 1 ... bit 5 = dot 6)
+_BRAILLE_ASCII = " A1B'K2L@CIF/MSP\"E3H9O6R^DJG>NTQ,*5<-U8V.%[$+X!&;:4\\0Z7(_?W]#Y)="
+
+
+class _ASCIITable(dict):
+    """str.translate table: braille cells -> braille ASCII, anything unknown -> space."""
+
+    def __missing__(self, code):
+        return 0x20
+
+
+_ASCII_TABLE = _ASCIITable({0x2800 + offset: ord(char) for offset, char in enumerate(_BRAILLE_ASCII)})
+_ASCII_TABLE[ord(" ")] = ord(" ")
+
+# Braille page numbers: number sign, then digits as the letters a-j
+_PAGE_DIGITS = str.maketrans("1234567890", "ABCDEFGHIJ")
+
+
+def create_word_document(text):
+    # Creates a Word document in memory from the provided text using python-docx
+    with span("export.docx", size=len(text)):
+        return _build_word_document(text)
+
+
+def _build_word_document(text):
+    from docx import Document
+    document = Document()
+
+    paragraphs = text.split('\n\n')
+    for p_text in paragraphs:
+        p_text = p_text.replace('\n', ' ')
+
+        if "-- Page Break --" in p_text:
+            document.add_section()
+        else:
+            document.add_paragraph(p_text)
+
+    doc_buffer = io.BytesIO()
+    document.save(doc_buffer)
+    doc_buffer.seek(0)
+    return doc_buffer
+
+
+class BRFWriter:
+    """
+    Streams braille (Unicode cells, as BrailleTranslator produces them) into a
+    BRF file: braille ASCII, `cells_per_line` x `lines_per_page`, CRLF line
+    ends and a form feed after every page.
+
+    Paragraphs (separated by blank lines, as in the DOCX export) are wrapped
+    at spaces; longer words are split at the margin. One blank line is kept
+    between paragraphs, never at the top of a page. The translated page break marker starts a new braille page. With
+    page_numbers, the last line of every page holds its number at the right
+    margin. Only the page being filled is kept in memory; finished pages are
+    written to the binary `stream` straight away.
+    """
+
+    def __init__(self, stream, page_break=None, cells_per_line=40, lines_per_page=25, page_numbers=True):
+        self.stream = stream
+        self.cells_per_line = cells_per_line
+        self.lines_per_page = lines_per_page
+        self.page_numbers = page_numbers
+        # Lines of text per page; the number line is reserved
+        self._text_lines = lines_per_page - 1 if page_numbers else lines_per_page
+        # The page break marker line, in braille ASCII
+        self._page_break = page_break.strip().translate(_ASCII_TABLE) if page_break else None
+        self._pending = ""
+        # Output line being filled, and the finished lines of the current page
+        self._current = ""
+        self._lines = []
+        self.pages = 0
+        self.bytes_written = 0
+
+    def write(self, braille):
+        """Adds a chunk of braille; chunks may end mid-line or mid-word."""
+        start = 0
+        end = braille.find("\n")
+        while end >= 0:
+            self._add_line(self._pending + braille[start:end])
+            self._pending = ""
+            start = end + 1
+            end = braille.find("\n", start)
+        self._pending += braille[start:]
+
+    def close(self):
+        """Writes the last line and page. Returns {"pages", "bytes"}."""
+        if self._pending:
+            self._add_line(self._pending)
+            self._pending = ""
+        self._end_paragraph()
+        self._end_page()
+        return {"pages": self.pages, "bytes": self.bytes_written}
+
+    def _add_line(self, line):
+        line = line.translate(_ASCII_TABLE)
+        if self._page_break is not None and line.strip() == self._page_break:
+            self._end_paragraph()
+            self._end_page()
+            return
+
+        words = line.split()
+        if not words:
+            # Paragraph gap: one blank line, never at the top of a page
+            self._end_paragraph()
+            if self._lines and self._lines[-1]:
+                self._emit("")
+            return
+
+        # Single line breaks inside a paragraph are soft: the line being
+        # filled carries over to the next input line
+        width = self.cells_per_line
+        current = self._current
+        for word in words:
+            while len(word) > width:
+                if current:
+                    self._emit(current)
+                    current = ""
+                self._emit(word[:width])
+                word = word[width:]
+            if not current:
+                current = word
+            elif len(current) + 1 + len(word) <= width:
+                current += " " + word
+            else:
+                self._emit(current)
+                current = word
+        self._current = current
+
+    def _end_paragraph(self):
+        if self._current:
+            self._emit(self._current)
+            self._current = ""
+
+    def _emit(self, line):
+        self._lines.append(line)
+        if len(self._lines) == self._text_lines:
+            self._end_page()
+
+    def _end_page(self):
+        # A paragraph gap is not carried over to the bottom of a page
+        while self._lines and not self._lines[-1]:
+            self._lines.pop()
+        if not self._lines:
+            return
+        self.pages += 1
+        lines = self._lines
+        if self.page_numbers:
+            number = "#" + str(self.pages).translate(_PAGE_DIGITS)
+            lines += [""] * (self._text_lines - len(lines))
+            lines.append(number.rjust(self.cells_per_line))
+        data = ("\r\n".join(lines) + "\r\n\f").encode("ascii")
+        self.stream.write(data)
+        self.bytes_written += len(data)
+        self._lines = []
+
+
+def write_brf(braille, stream, translator=None, **options):
+    """
+    Writes braille to `stream` as BRF (see BRFWriter). `braille` is a string
+    or an iterable of chunks, e.g. translator.translate_iter(...). Pass the
+    translator that produced it so page break markers start new pages.
+    Returns {"pages", "bytes"}.
+    """
+    page_break = translator.translate(PAGE_BREAK) if translator is not None else None
+    writer = BRFWriter(stream, page_break=page_break, **options)
+    chunks = [braille] if isinstance(braille, str) else braille
+    with span("export.brf", size=len(braille) if isinstance(braille, str) else None):
+        for chunk in chunks:
+            writer.write(chunk)
+        return writer.close()
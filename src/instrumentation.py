@@ -0,0 +1,140 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("pdf2braille.instrumentation")
+
+# The active Recorder for this thread / context (None = instrumentation off)
+_current = contextvars.ContextVar("instrumentation_recorder", default=None)
+
+
+class Recorder:
+    """Collects timing spans and counters for one conversion run."""
+
+    def __init__(self):
+        self.spans = []
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def add_span(self, name, start, duration, page=None, size=None, attrs=None):
+        span = {"name": name, "start": round(start - self._origin, 6), "duration": round(duration, 6)}
+        if page is not None:
+            span["page"] = page
+        if size is not None:
+            span["size"] = size
+        if attrs:
+            span.update(attrs)
+        with self._lock:
+            self.spans.append(span)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self):
+        """Per span name: number of spans, total/mean/max seconds and total size."""
+        stages = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            stage = stages.setdefault(span["name"], {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0, "total_size": 0})
+            stage["count"] += 1
+            stage["total_seconds"] += span["duration"]
+            stage["max_seconds"] = max(stage["max_seconds"], span["duration"])
+            stage["total_size"] += span.get("size") or 0
+        for stage in stages.values():
+            stage["mean_seconds"] = stage["total_seconds"] / stage["count"]
+        return stages
+
+    def to_dict(self):
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        return {"spans": spans, "counters": counters, "summary": self.summary()}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def log_lines(self):
+        """One key=value line per span, then one per counter."""
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        lines = []
+        for span in spans:
+            lines.append("span " + " ".join(f"{key}={value}" for key, value in span.items()))
+        for name, value in sorted(counters.items()):
+            lines.append(f"counter name={name} value={value}")
+        return lines
+
+    def log(self, level=logging.INFO):
+        for line in self.log_lines():
+            logger.log(level, line)
+
+
+class _Span:
+    __slots__ = ("recorder", "name", "page", "size", "attrs", "start")
+
+    def __init__(self, recorder, name, page, size, attrs):
+        self.recorder = recorder
+        self.name = name
+        self.page = page
+        self.size = size
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.recorder.add_span(self.name, self.start, time.perf_counter() - self.start,
+                               self.page, self.size, self.attrs)
+        return False
+
+
+class _NullSpan:
+    """Returned when instrumentation is off: entering and leaving do nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, page=None, size=None, **attrs):
+    """Times a block: `with span("ocr.detect", page=i, size=pixels): ...`"""
+    recorder = _current.get()
+    if recorder is None:
+        return _NULL_SPAN
+    return _Span(recorder, name, page, size, attrs)
+
+
+def count(name, n=1):
+    """Adds n to a counter (model calls, cache hits, ...)."""
+    recorder = _current.get()
+    if recorder is not None:
+        recorder.count(name, n)
+
+
+def current_recorder():
+    return _current.get()
+
+
+@contextmanager
+def recording(recorder=None):
+    """Turns instrumentation on for the enclosed block (and code it calls)."""
+    recorder = recorder if recorder is not None else Recorder()
+    token = _current.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
@@ -0,0 +1,567 @@
+"""
+Local background job queue for PDF conversions.
+
+Job state lives in a SQLite file and uploaded PDFs in a directory next to
+it, so the Streamlit app (any number of sessions) and the worker process
+only share local storage. The worker holds one warm OCREngine /
+TextCorrector / BrailleTranslator set and serves every queued job with it.
+The OCR engine and corrector load in background threads as soon as the
+worker starts, and their readiness is recorded in the store for the app.
+
+    python -m src.jobs [--concurrency 1]     # run a worker in the foreground
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+
+from src.cache import SQLiteCache
+from src.instrumentation import Recorder, recording
+
+logger = logging.getLogger("pdf2braille.jobs")
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+# Engine states reported by a worker while it warms up
+LOADING, READY = "loading", "ready"
+
+# A worker that has not written a heartbeat for this long is considered dead
+WORKER_TIMEOUT = 30.0
+HEARTBEAT_INTERVAL = 5.0
+# Finished jobs (and their results) are deleted after this long, keeping at
+# most MAX_FINISHED_JOBS of them; workers prune every PRUNE_INTERVAL seconds
+RESULT_RETENTION = 24 * 3600.0
+MAX_FINISHED_JOBS = 100
+PRUNE_INTERVAL = 600.0
+# Inputs no job references are removed by prune() once they are this old (seconds)
+INPUT_GRACE = 60.0
+
+
+class JobCancelled(Exception):
+    """Raised inside a running conversion when its job was cancelled."""
+
+
+class JobStore:
+    """
+    Persistent job state: one row per job plus one per worker process.
+    Safe to use from several threads and processes at once.
+    Sessions waiting on a job are recorded as its subscribers, so one
+    session cancelling a shared (deduplicated) job does not stop it for
+    the others.
+    """
+
+    def __init__(self, path=os.path.join(".cache", "jobs.sqlite")):
+        self.path = path
+        # Uploaded PDFs wait here until their job has run
+        self.input_dir = os.path.splitext(path)[0] + "_inputs"
+        os.makedirs(self.input_dir, exist_ok=True)
+        self._lock = threading.Lock()
+
+        # One connection shared by every thread (guarded by self._lock)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, dedupe_key TEXT, options TEXT NOT NULL, status TEXT NOT NULL, "
+            "stage TEXT, done INTEGER NOT NULL DEFAULT 0, total INTEGER NOT NULL DEFAULT 0, "
+            "error TEXT, cancel_requested INTEGER NOT NULL DEFAULT 0, worker_id TEXT, "
+            "created REAL NOT NULL, started REAL, finished REAL, result TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedupe_key ON jobs(dedupe_key)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS subscribers (job_id TEXT NOT NULL, session_id TEXT NOT NULL, "
+            "PRIMARY KEY (job_id, session_id))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS workers (id TEXT PRIMARY KEY, pid INTEGER, started REAL, heartbeat REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS engines (worker_id TEXT NOT NULL, name TEXT NOT NULL, status TEXT NOT NULL, "
+            "seconds REAL, error TEXT, PRIMARY KEY (worker_id, name))"
+        )
+        self._conn.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def _fetchone(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def input_path(self, job_id):
+        return os.path.join(self.input_dir, f"{job_id}.pdf")
+
+    def _remove_input(self, job_id):
+        try:
+            os.remove(self.input_path(job_id))
+        except OSError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Submission side (the app)
+    # ------------------------------------------------------------------
+    def submit(self, pdf_bytes, options, dedupe_key=None, session_id=None):
+        """
+        Queues a conversion and returns its job id. When `dedupe_key` matches a
+        job that is queued, running (and not being cancelled) or done, that
+        job's id is returned instead. `session_id` subscribes the caller's
+        session to the job (see cancel()).
+        """
+        if dedupe_key is not None:
+            row = self._fetchone(
+                "SELECT id FROM jobs WHERE dedupe_key = ? AND status IN (?, ?, ?) AND cancel_requested = 0 "
+                "ORDER BY created DESC LIMIT 1",
+                (dedupe_key, QUEUED, RUNNING, DONE)
+            )
+            if row is not None:
+                self._subscribe(row[0], session_id)
+                return row[0]
+
+        job_id = uuid.uuid4().hex
+        # Write the input before the row exists, so a worker never claims a job without one
+        with open(self.input_path(job_id), "wb") as f:
+            f.write(pdf_bytes)
+        self._execute(
+            "INSERT INTO jobs (id, dedupe_key, options, status, created) VALUES (?, ?, ?, ?, ?)",
+            (job_id, dedupe_key, json.dumps(options), QUEUED, time.time())
+        )
+        self._subscribe(job_id, session_id)
+        return job_id
+
+    def _subscribe(self, job_id, session_id):
+        if session_id is not None:
+            self._execute("INSERT OR IGNORE INTO subscribers (job_id, session_id) VALUES (?, ?)", (job_id, session_id))
+
+    def get(self, job_id):
+        """Job state (without the result) as a dict, or None for an unknown id."""
+        row = self._fetchone(
+            "SELECT id, options, status, stage, done, total, error, cancel_requested, created, started, finished "
+            "FROM jobs WHERE id = ?", (job_id,)
+        )
+        if row is None:
+            return None
+        job = dict(zip(("id", "options", "status", "stage", "done", "total", "error", "cancel_requested",
+                        "created", "started", "finished"), row))
+        job["options"] = json.loads(job["options"])
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def queue_position(self, job_id):
+        """Number of queued jobs ahead of this one (0 = next)."""
+        row = self._fetchone(
+            "SELECT COUNT(*) FROM jobs WHERE status = ? AND created < (SELECT created FROM jobs WHERE id = ?)",
+            (QUEUED, job_id)
+        )
+        return row[0]
+
+    def result(self, job_id):
+        row = self._fetchone("SELECT result FROM jobs WHERE id = ? AND status = ?", (job_id, DONE))
+        return json.loads(row[0]) if row is not None else None
+
+    def cancel(self, job_id, session_id=None):
+        """
+        Queued jobs are cancelled at once; running ones stop at their next page.
+        With a `session_id`, only that session's subscription is dropped, and
+        the job is cancelled only when no other session is waiting on it.
+        Returns True when the job itself was cancelled.
+        """
+        if session_id is not None:
+            self._execute("DELETE FROM subscribers WHERE job_id = ? AND session_id = ?", (job_id, session_id))
+            if self._fetchone("SELECT 1 FROM subscribers WHERE job_id = ? LIMIT 1", (job_id,)) is not None:
+                return False
+        cancelled = self._execute(
+            "UPDATE jobs SET status = ?, finished = ? WHERE id = ? AND status = ?",
+            (CANCELLED, time.time(), job_id, QUEUED)
+        ).rowcount
+        if cancelled:
+            # No worker will claim it now, so nothing else removes its input
+            self._remove_input(job_id)
+        self._execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?", (job_id, RUNNING))
+        return True
+
+    def prune(self, max_age=RESULT_RETENTION, max_jobs=MAX_FINISHED_JOBS):
+        """
+        Deletes finished jobs (with their results) older than `max_age`
+        seconds, and all but the `max_jobs` most recent ones, then any input
+        no job row references. Returns the number of jobs deleted.
+        """
+        finished = ",".join("?" * len(FINISHED))
+        with self._lock:
+            deleted = self._conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({finished}) AND (finished < ? OR id NOT IN ("
+                f"SELECT id FROM jobs WHERE status IN ({finished}) ORDER BY finished DESC LIMIT ?))",
+                list(FINISHED) + [time.time() - max_age] + list(FINISHED) + [max_jobs]
+            ).rowcount
+            self._conn.execute("DELETE FROM subscribers WHERE job_id NOT IN (SELECT id FROM jobs)")
+            self._conn.commit()
+            referenced = {row[0] for row in self._conn.execute("SELECT id FROM jobs")}
+        # submit() writes the input just before inserting the row, so leave recent files alone
+        cutoff = time.time() - INPUT_GRACE
+        for name in os.listdir(self.input_dir):
+            job_id, extension = os.path.splitext(name)
+            if extension != ".pdf" or job_id in referenced:
+                continue
+            try:
+                if os.path.getmtime(self.input_path(job_id)) < cutoff:
+                    self._remove_input(job_id)
+            except OSError:
+                pass
+        return deleted
+
+    # ------------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------------
+    def claim(self, worker_id):
+        """Moves the oldest queued job to running for this worker and returns it (or None)."""
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock, so two workers never claim the same job
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, worker_id = ?, started = ? WHERE id = ?",
+                        (RUNNING, worker_id, time.time(), row[0])
+                    )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return self.get(row[0]) if row is not None else None
+
+    def set_progress(self, job_id, stage, done, total):
+        self._execute("UPDATE jobs SET stage = ?, done = ?, total = ? WHERE id = ?", (stage, done, total, job_id))
+
+    def cancel_requested(self, job_id):
+        row = self._fetchone("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,))
+        return bool(row and row[0])
+
+    def _finish(self, job_id, status, error=None, result=None):
+        self._execute(
+            "UPDATE jobs SET status = ?, error = ?, result = ?, finished = ? WHERE id = ?",
+            (status, error, None if result is None else json.dumps(result, ensure_ascii=False), time.time(), job_id)
+        )
+        self._remove_input(job_id)
+
+    def complete(self, job_id, result):
+        self._finish(job_id, DONE, result=result)
+
+    def fail(self, job_id, error):
+        self._finish(job_id, FAILED, error=error)
+
+    def mark_cancelled(self, job_id):
+        self._finish(job_id, CANCELLED)
+
+    def register_worker(self, worker_id, pid):
+        now = time.time()
+        self._execute(
+            "INSERT OR REPLACE INTO workers (id, pid, started, heartbeat) VALUES (?, ?, ?, ?)",
+            (worker_id, pid, now, now)
+        )
+
+    def heartbeat(self, worker_id):
+        self._execute("UPDATE workers SET heartbeat = ? WHERE id = ?", (time.time(), worker_id))
+
+    def unregister_worker(self, worker_id):
+        self._execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+        self._execute("DELETE FROM engines WHERE worker_id = ?", (worker_id,))
+
+    def set_engine_status(self, worker_id, name, status, seconds=None, error=None):
+        self._execute(
+            "INSERT OR REPLACE INTO engines (worker_id, name, status, seconds, error) VALUES (?, ?, ?, ?, ?)",
+            (worker_id, name, status, seconds, error)
+        )
+
+    def engine_status(self):
+        """
+        {engine name: {"status": LOADING | READY | FAILED, "seconds", "error"}}
+        for the most recently started live worker ({} while none has reported).
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, status, seconds, error FROM engines WHERE worker_id = ("
+                "SELECT id FROM workers WHERE heartbeat >= ? ORDER BY started DESC LIMIT 1)",
+                (time.time() - WORKER_TIMEOUT,)
+            ).fetchall()
+        return {name: {"status": status, "seconds": seconds, "error": error} for name, status, seconds, error in rows}
+
+    def live_workers(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM workers WHERE heartbeat >= ?", (time.time() - WORKER_TIMEOUT,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def requeue_orphans(self):
+        """Puts running jobs of dead workers back in the queue (or cancels them if asked)."""
+        live = self.live_workers()
+        marks = ",".join("?" * len(live))
+        owner_dead = f"worker_id NOT IN ({marks})" if live else "1 = 1"
+        abandoned = f"status = ? AND cancel_requested = 1 AND {owner_dead}"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cancelled = [row[0] for row in self._conn.execute(
+                    f"SELECT id FROM jobs WHERE {abandoned}", [RUNNING] + live
+                )]
+                self._conn.execute(
+                    f"UPDATE jobs SET status = ?, finished = ? WHERE {abandoned}", [CANCELLED, time.time(), RUNNING] + live
+                )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        for job_id in cancelled:
+            self._remove_input(job_id)
+        self._execute(
+            f"UPDATE jobs SET status = ?, worker_id = NULL, started = NULL, stage = NULL, done = 0, total = 0 "
+            f"WHERE status = ? AND {owner_dead}",
+            [QUEUED, RUNNING] + live
+        )
+
+
+class WarmEngine:
+    """
+    An engine loading in a background thread. Attribute access waits until it
+    is loaded (and re-raises its load error), so a job can start OCR while the
+    corrector is still loading.
+    """
+
+    def __init__(self, name, load, on_status=None):
+        self.name = name
+        self._load = load
+        self._on_status = on_status
+        self._engine = None
+        self._error = None
+        self._loaded = threading.Event()
+        threading.Thread(target=self._run, name=f"warmup-{name}", daemon=True).start()
+
+    def _run(self):
+        self._report(LOADING)
+        start = time.perf_counter()
+        try:
+            self._engine = self._load()
+        except BaseException as error:
+            self._error = error
+            logger.exception("%s failed to load", self.name)
+            self._report(FAILED, error=f"{type(error).__name__}: {error}")
+        else:
+            seconds = time.perf_counter() - start
+            logger.info("%s ready in %.1fs", self.name, seconds)
+            self._report(READY, seconds=round(seconds, 3))
+        finally:
+            self._loaded.set()
+
+    def _report(self, status, seconds=None, error=None):
+        if self._on_status is not None:
+            self._on_status(self.name, status, seconds, error)
+
+    @property
+    def ready(self):
+        return self._loaded.is_set() and self._error is None
+
+    def get(self):
+        self._loaded.wait()
+        if self._error is not None:
+            raise self._error
+        return self._engine
+
+    def __getattr__(self, attribute):
+        return getattr(self.get(), attribute)
+
+
+def _load_ocr_engine(options):
+    # Imported here: easyocr / torch are only needed once the worker runs
+    from src.ocr_engine import OCREngine
+    engine = OCREngine(**options)
+    # On CPU the readers live in worker processes; "ready" means they are loaded
+    engine.warm_up()
+    return engine
+
+
+def _load_corrector(options):
+    from src.corrector import TextCorrector
+    return TextCorrector(**options)
+
+
+class JobWorker:
+    """
+    Runs queued jobs with one shared set of engines, at most `concurrency`
+    at a time. Meant to run alone in its own process (see main()).
+    """
+
+    def __init__(self, store, concurrency=1, poll_interval=0.5, worker_id=None, corrector_options=None,
+                 page_store_path=os.path.join(".cache", "pages.sqlite"), ocr_options=None):
+        self.store = store
+        # OCREngine keyword arguments (workers, threads_per_worker)
+        self.ocr_options = ocr_options or {}
+        # Per-page results of every converted document, by page fingerprint (None disables it)
+        self.page_store = SQLiteCache(page_store_path) if page_store_path else None
+        # TextCorrector keyword arguments (backend, model_dir, tiers)
+        self.corrector_options = corrector_options or {}
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or uuid.uuid4().hex
+        self._stop = threading.Event()
+        self._translators = {}
+        self._translators_lock = threading.Lock()
+
+    def _translator(self, grade):
+        from src.braille_mapper import BrailleTranslator
+        with self._translators_lock:
+            if grade not in self._translators:
+                self._translators[grade] = BrailleTranslator(grade=grade)
+            return self._translators[grade]
+
+    def _engine_status(self, name, status, seconds, error):
+        self.store.set_engine_status(self.worker_id, name, status, seconds, error)
+
+    def _heartbeat(self):
+        while not self._stop.wait(HEARTBEAT_INTERVAL):
+            self.store.heartbeat(self.worker_id)
+
+    def run(self):
+        self.store.register_worker(self.worker_id, os.getpid())
+        threading.Thread(target=self._heartbeat, name="jobs-heartbeat", daemon=True).start()
+        try:
+            # Load the models once, side by side, while already taking jobs;
+            # every job below shares them
+            self.ocr_engine = WarmEngine("ocr", lambda: _load_ocr_engine(self.ocr_options), self._engine_status)
+            self.corrector = WarmEngine("corrector", lambda: _load_corrector(self.corrector_options),
+                                        self._engine_status)
+            logger.info("worker %s started (concurrency %d)", self.worker_id, self.concurrency)
+
+            active = []
+            last_orphan_check = 0.0
+            last_prune = 0.0
+            while not self._stop.is_set():
+                active = [thread for thread in active if thread.is_alive()]
+                if time.time() - last_orphan_check >= HEARTBEAT_INTERVAL:
+                    self.store.requeue_orphans()
+                    last_orphan_check = time.time()
+                if time.time() - last_prune >= PRUNE_INTERVAL:
+                    pruned = self.store.prune()
+                    if pruned:
+                        logger.info("pruned %d finished job(s)", pruned)
+                    last_prune = time.time()
+                job = self.store.claim(self.worker_id) if len(active) < self.concurrency else None
+                if job is None:
+                    time.sleep(self.poll_interval)
+                    continue
+                thread = threading.Thread(target=self.process, args=(job,), name=f"job-{job['id']}", daemon=True)
+                thread.start()
+                active.append(thread)
+        finally:
+            self._stop.set()
+            self.store.unregister_worker(self.worker_id)
+
+    def stop(self):
+        self._stop.set()
+
+    def process(self, job):
+        from src.corrector import TextCorrector
+        from src.pipeline import DocumentPipeline
+
+        job_id, options = job["id"], job["options"]
+        grade = options.get("grade", 1)
+
+        def on_progress(stage, done, total):
+            self.store.set_progress(job_id, stage, done, total)
+            if self.store.cancel_requested(job_id):
+                raise JobCancelled(job_id)
+
+        recorder = Recorder() if options.get("record_timings") else None
+        try:
+            pipeline = DocumentPipeline(self.ocr_engine, self.corrector, self._translator(grade),
+                                        use_correction=options.get("use_correction", True),
+                                        page_store=self.page_store,
+                                        # Known without waiting for the corrector to load
+                                        correction_key=TextCorrector.options_key(**self.corrector_options))
+            with open(self.store.input_path(job_id), "rb") as pdf_file:
+                with recording(recorder) if recorder is not None else nullcontext():
+                    conversion = pipeline.run(pdf_file, pipelined=options.get("pipelined", True),
+                                              progress_callback=on_progress)
+        except JobCancelled:
+            logger.info("job %s cancelled", job_id)
+            self.store.mark_cancelled(job_id)
+            return
+        except Exception as error:
+            logger.exception("job %s failed", job_id)
+            self.store.fail(job_id, f"{type(error).__name__}: {error}")
+            return
+
+        if recorder is not None:
+            recorder.log()
+        self.store.complete(job_id, {
+            "english": conversion["english"],
+            "raw_english": conversion["raw_english"],
+            "page_sources": conversion["page_sources"],
+            "correction_stats": conversion["correction_stats"],
+            "page_reuse": conversion["page_reuse"],
+            "grade": grade,
+            "braille": conversion["braille"],
+            "timings": recorder.to_dict() if recorder is not None else None,
+        })
+
+
+_spawn_lock = threading.Lock()
+
+
+def ensure_worker(store, concurrency=1):
+    """
+    Starts a background worker process unless one is alive already.
+    Registers it right away so concurrent callers don't start a second one.
+    """
+    with _spawn_lock:
+        if store.live_workers():
+            return None
+        worker_id = uuid.uuid4().hex
+        process = subprocess.Popen(
+            [sys.executable, "-m", "src.jobs", "--db", os.path.abspath(store.path),
+             "--concurrency", str(concurrency), "--worker-id", worker_id],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        store.register_worker(worker_id, process.pid)
+        return process
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.path.join(".cache", "jobs.sqlite"), help="job state database")
+    parser.add_argument("--concurrency", type=int, default=1, help="jobs run at the same time")
+    parser.add_argument("--corrector-backend", default="pytorch", choices=("pytorch", "int8", "onnx"),
+                        help="T5 corrector inference backend")
+    parser.add_argument("--model-dir", default=None, help="local corrector model directory (no network access)")
+    parser.add_argument("--tiers", nargs="+", default=["t5"], choices=("symspell", "t5"),
+                        help="correction tiers, in order (e.g. --tiers symspell t5)")
+    parser.add_argument("--ocr-workers", type=int, default=None,
+                        help="OCR worker processes on CPU (default: one per core, at most 4; each loads its own model)")
+    parser.add_argument("--worker-id", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    worker = JobWorker(JobStore(args.db), concurrency=args.concurrency, worker_id=args.worker_id,
+                       corrector_options={"backend": args.corrector_backend, "model_dir": args.model_dir,
+                                          "tiers": tuple(args.tiers)},
+                       ocr_options={"workers": args.ocr_workers})
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,274 @@
-import easyocr
 import numpy as np
-from pdf2image import convert_from_bytes
+from pdf2image import convert_from_path, pdfinfo_from_path
+from contextlib import contextmanager
+from src.cache import SQLiteCache, make_key
+from src.instrumentation import count, span
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import hashlib
+import multiprocessing
 import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+import weakref
 
 
 
 POPPLER_PATH = r".\poppler_binaries\poppler-25.11.0\Library\bin"
 
+@contextmanager
+def temporary_pdf(pdf_file):
+    """Writes the uploaded PDF (file-like object or bytes) to a temp file once,
+    so poppler can rasterize it page range by page range."""
+    fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        _write_pdf(fd, pdf_file)
+        yield pdf_path
+    finally:
+        os.remove(pdf_path)
+
+def _write_pdf(fd, pdf_file):
+    with os.fdopen(fd, "wb") as f:
+        if isinstance(pdf_file, (bytes, bytearray)):
+            f.write(pdf_file)
+        else:
+            shutil.copyfileobj(pdf_file, f)
+
+class _SharedPDF:
+    """
+    Like temporary_pdf, for pages that may need a re-render after the
+    generator that rendered them is done (adaptive DPI in pipelined mode):
+    every page holding a re-render callback keeps the file alive, and it is
+    removed with the last reference.
+    """
+
+    def __init__(self, pdf_file):
+        fd, self.path = tempfile.mkstemp(suffix=".pdf")
+        self._remove = weakref.finalize(self, os.remove, self.path)
+        _write_pdf(fd, pdf_file)
+
+    def render_page(self, page_number, poppler_path, dpi, grayscale):
+        return _render_page(self.path, page_number, poppler_path, dpi, grayscale)
+
+def _render_page(pdf_path, page_number, poppler_path, dpi, grayscale):
+    """Rasterizes one page (1-based) again, for the adaptive second pass."""
+    return convert_from_path(
+        pdf_path, poppler_path=poppler_path, dpi=dpi, grayscale=grayscale,
+        first_page=page_number, last_page=page_number
+    )[0]
+
+def _normalize_text_layer(text):
+    """Reflows pdftotext output into the same shape as EasyOCR paragraph mode:
+    one paragraph per line, paragraphs separated by a blank line."""
+    paragraphs = []
+    for block in re.split(r'\n\s*\n', text):
+        block = " ".join(block.split())
+        if block:
+            paragraphs.append(block)
+    return "\n\n".join(paragraphs)
+
+def _merge_paragraphs(regions):
+    """
+    Groups line regions into paragraphs exactly like EasyOCR's paragraph mode.
+    A paragraph's confidence is the lowest of its lines (those whose box
+    centre falls inside the paragraph box).
+    """
+    from easyocr.utils import get_paragraph
+    paragraphs = []
+    for box, text in get_paragraph([[r["box"], r["text"], r["confidence"]] for r in regions]):
+        xs = [point[0] for point in box]
+        ys = [point[1] for point in box]
+        confidences = [
+            r["confidence"] for r in regions
+            if min(xs) <= sum(p[0] for p in r["box"]) / 4 <= max(xs)
+            and min(ys) <= sum(p[1] for p in r["box"]) / 4 <= max(ys)
+        ]
+        paragraphs.append({
+            "text": text,
+            "confidence": min(confidences) if confidences else 0.0,
+            "box": [[int(x), int(y)] for x, y in box],
+        })
+    return paragraphs
+
+def _text_layer_fingerprint(text):
+    return make_key("text_layer", text)
+
+def _bounds(box):
+    """(x_min, x_max, y_min, y_max) of a region box given as corner points."""
+    xs = [point[0] for point in box]
+    ys = [point[1] for point in box]
+    return min(xs), max(xs), min(ys), max(ys)
+
+def detect_device():
+    """Returns "cuda" or "mps" when torch can see a GPU, else "cpu"."""
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
+    if torch.cuda.is_available():
+        return "cuda"
+    mps = getattr(torch.backends, "mps", None)
+    if mps is not None and mps.is_available():
+        return "mps"
+    return "cpu"
+
+# --------------------------------------------------------------------------
+# OCR worker processes (CPU mode). Each worker builds its own single-process
+# OCREngine, i.e. loads its own EasyOCR reader, once, then OCRs page ranges.
+# --------------------------------------------------------------------------
+_worker_engine = None
+
+def _init_ocr_worker(engine_kwargs, threads):
+    global _worker_engine
+    # Cap the threads of each worker so N workers don't fight over the cores
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    import cv2
+    import torch
+    cv2.setNumThreads(threads)
+    torch.set_num_threads(threads)
+    _worker_engine = OCREngine(**engine_kwargs)
+
+def _ocr_page_range(pdf_path, first_page, last_page, poppler_path):
+    """Rasterizes and OCRs pages first_page..last_page (1-based, inclusive) in a
+    worker. Returns [(page_index, text, source, regions, fingerprint)] in page order."""
+    engine = _worker_engine
+    images = convert_from_path(
+        pdf_path, poppler_path=poppler_path, dpi=engine.dpi, grayscale=engine.grayscale,
+        first_page=first_page, last_page=last_page, thread_count=1
+    )
+    results = []
+    page = first_page
+    while images:
+        rerender = None
+        if engine.adaptive_dpi:
+            # The task's own copy of the PDF is still on disk until it returns
+            rerender = partial(_render_page, pdf_path, page, poppler_path, grayscale=engine.grayscale)
+        img = images.pop(0)
+        fingerprint = engine._page_cache_key(img)
+        text, source, regions = engine._recognize_page(img, page - 1, rerender, fingerprint)
+        results.append((page - 1, text, source, regions, fingerprint))
+        page += 1
+    return results
+
+def _worker_ready():
+    # Only runs once the worker's initializer has loaded its reader; holding the
+    # worker briefly spreads a round of these calls over all the workers
+    time.sleep(0.05)
+    return os.getpid()
+
 class OCREngine:
-    
-    def __init__(self):
-        # Initialize Reader (loads model into memory)
-        # 'gpu=True' recommended if you have CUDA, else False
-        self.reader = easyocr.Reader(['en'], gpu=True) 
+    # Default cap on OCR worker processes: each one holds its own EasyOCR
+    # reader and torch (several hundred MB), so a many-core server must not
+    # start one per core unless asked to (pass workers=...)
+    MAX_DEFAULT_WORKERS = 4
 
-    def process_pdf(self, pdf_file):
+    def __init__(self, page_window=2, use_text_layer=True, min_text_chars=25, dpi=200,
+                 cache_path=os.path.join(".cache", "ocr_pages.sqlite"), cache_max_bytes=128 * 1024 * 1024,
+                 device="auto", workers=None, threads_per_worker=1, grayscale=True, render_threads=None,
+                 adaptive_dpi=None, adaptive_confidence=0.5, min_line_height=16):
+        # Recognition settings; they are part of the page cache key
+        self.languages = ['en']
+        self.dpi = dpi
+        self.paragraph = True
+        # Render pages as 8-bit grayscale: a third of the RGB size, and EasyOCR
+        # recognizes on grayscale anyway
+        self.grayscale = grayscale
+        # Adaptive mode: pages are rendered at `dpi` (set it low, e.g. 150) and only
+        # lines that are lower than `min_line_height` pixels or read with less than
+        # `adaptive_confidence` are read again from a re-render at `adaptive_dpi`.
+        # Pages where nothing was detected are OCR'd again in full at adaptive_dpi.
+        self.adaptive_dpi = adaptive_dpi
+        self.adaptive_confidence = adaptive_confidence
+        self.min_line_height = min_line_height
+        # "auto" uses the GPU when torch sees one ("cuda" / "mps"), else "cpu"
+        self.device = detect_device() if device == "auto" else device
+        # On CPU, pages are sharded over worker processes, each with its own reader.
+        # None = as many workers as fit on the cores with `threads_per_worker` threads each,
+        # at most MAX_DEFAULT_WORKERS.
+        # A GPU is driven from this process only.
+        self.threads_per_worker = max(1, threads_per_worker)
+        if self.device != "cpu":
+            self.workers = 1
+        elif workers is None:
+            self.workers = max(1, min(self.MAX_DEFAULT_WORKERS, (os.cpu_count() or 1) // self.threads_per_worker))
+        else:
+            self.workers = max(1, workers)
+        self._pool = None
+        # Initialize Reader (loads model into memory). With worker processes the
+        # reader here is only loaded if a page is OCR'd in-process.
+        self.reader = self._load_reader() if self.workers == 1 else None
+        # Number of pages rasterized at a time. Peak memory depends on this,
+        # not on the page count of the document.
+        self.page_window = page_window
+        # Poppler processes rendering one window in parallel (None = one per page,
+        # up to the core count)
+        self.render_threads = render_threads or min(page_window, os.cpu_count() or 1)
+        # Born-digital pages are read straight from the PDF text layer;
+        # only scanned / image-only pages go through EasyOCR.
+        self.use_text_layer = use_text_layer
+        self.min_text_chars = min_text_chars
+        # Persistent cache of EasyOCR output per rendered page (None disables it)
+        self.cache = SQLiteCache(cache_path, cache_max_bytes) if cache_path else None
+        # Settings a worker process needs to rebuild this engine in single-process mode
+        self._worker_kwargs = {
+            "page_window": page_window, "use_text_layer": False, "min_text_chars": min_text_chars, "dpi": dpi,
+            "cache_path": cache_path, "cache_max_bytes": cache_max_bytes, "device": "cpu", "workers": 1,
+            "grayscale": grayscale, "render_threads": 1, "adaptive_dpi": adaptive_dpi,
+            "adaptive_confidence": adaptive_confidence, "min_line_height": min_line_height,
+        }
+
+    def _load_reader(self):
+        # EasyOCR is imported on first use; with worker processes only the workers need it
+        import easyocr
+        # EasyOCR takes False for CPU, or the torch device name
+        return easyocr.Reader(self.languages, gpu=self.device if self.device != "cpu" else False)
+
+    def _get_pool(self):
+        # Started on first use and kept, so each worker loads its reader only once.
+        # "spawn" avoids forking a process that already has torch threads running.
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_ocr_worker,
+                initargs=(self._worker_kwargs, self.threads_per_worker),
+            )
+        return self._pool
+
+    def warm_up(self):
+        """
+        Starts the OCR worker processes and returns once every one of them has
+        loaded its reader (the pool otherwise starts on the first page). In
+        single-process mode the reader is loaded in __init__ already.
+        """
+        if self.workers == 1:
+            return
+        pool = self._get_pool()
+        ready = set()
+        while len(ready) < self.workers:
+            futures = [pool.submit(_worker_ready) for _ in range(self.workers)]
+            ready.update(future.result() for future in futures)
+
+    def close(self):
+        """Stops the OCR worker processes, if any were started."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
 
-        print("Processing PDF...")
-        
+    def _get_poppler_path(self):
         # --- CONFIGURATION START ---
         # 1. Get the current working directory as base path
         base_path = os.getcwd()
-        
+
         # 2. Define the path to the poppler 'bin' folder relative to your project
         # UPDATE THIS PATH to match exactly where you extracted the bin folder
         # Example: if you put it in a folder named 'poppler' inside your project:
         poppler_path = os.path.join(base_path, "poppler_binaries", "poppler-25.11.0", "Library", "bin")
-        
+
         # 3. Validation to help you debug if the path is wrong
         if not os.path.exists(poppler_path):
             # Fallback: Try to find standard structure if the user just unzipped it
@@ -34,23 +276,304 @@ class OCREngine:
             poppler_path = POPPLER_PATH
 
         if not os.path.exists(os.path.join(poppler_path, 'pdfinfo.exe')):
+            # 4. Poppler installed system-wide (e.g. poppler-utils on Linux)
+            if shutil.which('pdfinfo'):
+                return None
             raise FileNotFoundError(f"Could not find pdfinfo.exe at: {poppler_path}. Please check the folder structure.")
         # --- CONFIGURATION END ---
+        return poppler_path
+
+    def _is_usable_text(self, text):
+        # A usable text layer has enough characters and is mostly readable text
+        # (broken font encodings tend to produce symbol soup)
+        stripped = "".join(text.split())
+        if len(stripped) < self.min_text_chars:
+            return False
+        readable = sum(1 for c in stripped if c.isalnum() or c in ".,;:!?'\"()-")
+        return readable / len(stripped) >= 0.7
+
+    def _extract_text_layer(self, pdf_path, first_page, last_page, poppler_path):
+        """
+        Runs poppler's pdftotext over a page range.
+        Returns {page_number: text} for the pages with a usable text layer.
+        """
+        pdftotext = os.path.join(poppler_path, "pdftotext") if poppler_path else "pdftotext"
+        try:
+            out = subprocess.run(
+                [pdftotext, "-f", str(first_page), "-l", str(last_page), "-enc", "UTF-8", pdf_path, "-"],
+                capture_output=True, check=True
+            ).stdout.decode("utf-8", errors="replace")
+        except (OSError, subprocess.CalledProcessError):
+            # Fallback: treat every page as scanned
+            return {}
+
+        layer_texts = {}
+        # pdftotext ends every page with a form feed
+        for page_number, text in zip(range(first_page, last_page + 1), out.split("\f")):
+            if self._is_usable_text(text):
+                layer_texts[page_number] = _normalize_text_layer(text)
+        return layer_texts
+
+    def _ocr_image(self, img, page_index=None, rerender=None):
+        """Returns (page_text, regions). `rerender(dpi)` renders the page again
+        (adaptive mode only)."""
+        regions = self._ocr_lines(img, page_index)
+        if self.adaptive_dpi and rerender is not None:
+            regions = self._refine_lines(regions, rerender, page_index)
+        if self.paragraph:
+            regions = _merge_paragraphs(regions)
+        return "\n\n".join(region["text"] for region in regions), regions
 
-        # Convert PDF to List of PIL Images
-        images = convert_from_bytes(pdf_file.read(),poppler_path=poppler_path)
-
-        page_texts = []
-        
-        
-        for i, img in enumerate(images):
-            # EasyOCR expects numpy array
-            img_np = np.array(img)
-            
-            # Detail=0 gives simple text list
-            results = self.reader.readtext(img_np, detail=0, paragraph = True) 
-            
-            page_text = "\n\n".join(results)
-            page_texts.append(page_text)
-            
-        return page_texts
\ No newline at end of file
+    def _ocr_lines(self, img, page_index=None):
+        """EasyOCR line regions [{"text", "confidence", "box"}] of a page image."""
+        if self.reader is None:
+            self.reader = self._load_reader()
+        # EasyOCR expects numpy array (2-D for grayscale pages)
+        img_np = np.array(img)
+        count("ocr.image_bytes", img_np.nbytes)
+
+        # Same steps as reader.readtext(), split so detection and recognition
+        # can be timed separately
+        from easyocr.utils import reformat_input
+        img_color, img_grey = reformat_input(img_np)
+        with span("ocr.detect", page=page_index, size=img_grey.size):
+            horizontal_list, free_list = self.reader.detect(img_color)
+        with span("ocr.recognize", page=page_index, size=len(horizontal_list[0]) + len(free_list[0])):
+            # Detail=1 keeps each line's box and confidence; paragraphs are
+            # merged below so their confidence can be kept too
+            results = self.reader.recognize(
+                img_grey, horizontal_list[0], free_list[0], detail=1, paragraph=False
+            )
+
+        return [
+            {"text": text, "confidence": float(confidence), "box": [[int(x), int(y)] for x, y in box]}
+            for box, text, confidence in results
+        ]
+
+    def _refine_lines(self, lines, rerender, page_index=None):
+        """
+        Second pass of the adaptive mode: re-reads the small or low-confidence
+        lines from the page rendered at adaptive_dpi. A re-read replaces the
+        line only when it is more confident. Boxes stay in `dpi` pixels.
+        """
+        weak = [
+            i for i, line in enumerate(lines)
+            if line["confidence"] < self.adaptive_confidence
+            or _bounds(line["box"])[3] - _bounds(line["box"])[2] < self.min_line_height
+        ]
+        if lines and not weak:
+            return lines
+
+        scale = self.adaptive_dpi / self.dpi
+        with span("pdf.rerender", page=page_index):
+            high_res = rerender(self.adaptive_dpi)
+        count("ocr.rerendered_pages")
+
+        if not lines:
+            # Nothing detected: the text may be too small for the detector at `dpi`
+            count("ocr.rerendered_full_pages")
+            return [
+                dict(line, box=[[int(x / scale), int(y / scale)] for x, y in line["box"]])
+                for line in self._ocr_lines(high_res, page_index)
+            ]
+
+        from easyocr.utils import reformat_input
+        img_np = np.array(high_res)
+        _, img_grey = reformat_input(img_np)
+        height, width = img_grey.shape[:2]
+        boxes = []
+        for i in weak:
+            x_min, x_max, y_min, y_max = _bounds(lines[i]["box"])
+            # Clamped like EasyOCR does, so results can be matched back by corner
+            boxes.append([max(0, int(x_min * scale)), min(width, int(x_max * scale)),
+                          max(0, int(y_min * scale)), min(height, int(y_max * scale))])
+        with span("ocr.rerecognize", page=page_index, size=len(boxes)):
+            results = self.reader.recognize(img_grey, boxes, [], detail=1, paragraph=False)
+        count("ocr.rerecognized_lines", len(boxes))
+
+        # EasyOCR may return the boxes in another order
+        reread = {(int(box[0][0]), int(box[0][1])): (text, float(confidence)) for box, text, confidence in results}
+        refined = list(lines)
+        for i, box in zip(weak, boxes):
+            text, confidence = reread.get((box[0], box[2]), (None, -1.0))
+            if confidence > lines[i]["confidence"]:
+                refined[i] = {"text": text, "confidence": confidence, "box": lines[i]["box"]}
+        return refined
+
+    def _page_cache_key(self, img):
+        # Hash of the rendered pixels plus everything that changes the OCR output
+        page_hash = hashlib.sha256(img.tobytes()).hexdigest()
+        settings = [page_hash, img.mode, img.size, self.dpi, self.languages, self.paragraph]
+        if self.adaptive_dpi:
+            settings.append((self.adaptive_dpi, self.adaptive_confidence, self.min_line_height))
+        return make_key(*settings)
+
+    def _recognize_page(self, img, page_index=None, rerender=None, key=None):
+        """Returns (page_text, source, regions): cached EasyOCR output when this exact
+        page was seen before with the same settings, else a fresh OCR run.
+        regions is [{"text", "confidence", "box"}] per paragraph (or line).
+        `key` is the page's _page_cache_key when the caller has it already."""
+        if self.cache is None:
+            page_text, regions = self._ocr_image(img, page_index, rerender)
+            return page_text, "ocr", regions
+
+        key = key or self._page_cache_key(img)
+        cached = self.cache.get(key)
+        if isinstance(cached, dict):
+            count("ocr.cache_hits")
+            return cached["text"], "ocr_cache", cached["regions"]
+
+        # Entries written before confidences were kept (plain text) are redone
+        count("ocr.cache_misses")
+        page_text, regions = self._ocr_image(img, page_index, rerender)
+        self.cache.set(key, {"text": page_text, "regions": regions})
+        return page_text, "ocr", regions
+
+    def iter_rendered_pages(self, pdf_file, page_window=None):
+        """
+        First half of iter_pages: handles `page_window` pages at a time. Pages
+        with a usable text layer come with their text; the rest come with the
+        rasterized page image and still need recognize_page().
+        Yields a dict per page, in order:
+            {"index", "num_pages", "text", "source": "text_layer", "regions": None, "fingerprint"}  or
+            {"index", "num_pages", "image", "rerender", "fingerprint"}
+        The fingerprint identifies what the page's text is read from: the text
+        layer, or the rendered image plus the OCR settings (its page cache key).
+        """
+        poppler_path = self._get_poppler_path()
+        window = max(1, page_window or self.page_window)
+
+        # Adaptive pages may be re-rendered after this generator is done
+        shared_pdf = _SharedPDF(pdf_file)
+        pdf_path = shared_pdf.path
+        num_pages = pdfinfo_from_path(pdf_path, poppler_path=poppler_path)["Pages"]
+
+        for first_page in range(1, num_pages + 1, window):
+            last_page = min(first_page + window - 1, num_pages)
+            layer_texts = {}
+            if self.use_text_layer:
+                with span("pdf.text_layer", page=first_page - 1, size=last_page - first_page + 1):
+                    layer_texts = self._extract_text_layer(pdf_path, first_page, last_page, poppler_path)
+
+            page = first_page
+            while page <= last_page:
+                if page in layer_texts:
+                    count("ocr.text_layer_pages")
+                    yield {"index": page - 1, "num_pages": num_pages,
+                           "text": layer_texts[page], "source": "text_layer", "regions": None,
+                           "fingerprint": _text_layer_fingerprint(layer_texts[page])}
+                    page += 1
+                    continue
+
+                # Rasterize only the run of consecutive pages without a text layer
+                run_last = page
+                while run_last < last_page and (run_last + 1) not in layer_texts:
+                    run_last += 1
+                with span("pdf.rasterize", page=page - 1, size=run_last - page + 1):
+                    images = convert_from_path(
+                        pdf_path, poppler_path=poppler_path, dpi=self.dpi, grayscale=self.grayscale,
+                        first_page=page, last_page=run_last, thread_count=self.render_threads
+                    )
+
+                while images:
+                    # Pop each image so it can be garbage collected once OCR is done
+                    img = images.pop(0)
+                    rerender = None
+                    if self.adaptive_dpi:
+                        rerender = partial(shared_pdf.render_page, page, poppler_path, grayscale=self.grayscale)
+                    with span("pdf.fingerprint", page=page - 1):
+                        fingerprint = self._page_cache_key(img)
+                    yield {"index": page - 1, "num_pages": num_pages, "image": img,
+                           "rerender": rerender, "fingerprint": fingerprint}
+                    del img
+                    page += 1
+
+    def recognize_page(self, page):
+        """
+        Second half of iter_pages: OCRs a rendered page (no-op for text-layer
+        pages) and drops its image. Returns the page dict with "text", "source" and
+        "regions" (EasyOCR paragraphs with confidence and box).
+        """
+        img = page.pop("image", None)
+        rerender = page.pop("rerender", None)
+        if img is not None:
+            page["text"], page["source"], page["regions"] = self._recognize_page(
+                img, page["index"], rerender, page.get("fingerprint")
+            )
+            del img
+        return page
+
+    def iter_pages(self, pdf_file, page_window=None):
+        """
+        Generator that handles `page_window` pages at a time: pages with a usable
+        text layer are read directly, the rest are rasterized, OCR'd and freed
+        before moving on. With worker processes, page ranges are OCR'd in parallel.
+        Yields a dict per page, in order:
+            {"index", "num_pages", "text", "source": "text_layer" | "ocr" | "ocr_cache",
+             "regions": [{"text", "confidence", "box"}, ...] for OCR'd pages, None for the text layer,
+             "fingerprint" (see iter_rendered_pages)}
+        """
+        if self.workers > 1:
+            yield from self._iter_pages_sharded(pdf_file, page_window)
+            return
+        for page in self.iter_rendered_pages(pdf_file, page_window):
+            yield self.recognize_page(page)
+
+    def _iter_pages_sharded(self, pdf_file, page_window=None):
+        """
+        iter_pages over the worker pool: the text layer is read here, then every
+        run of pages without one is split into ranges of `page_window` pages that
+        the workers rasterize and OCR. Results are yielded in page order.
+        """
+        poppler_path = self._get_poppler_path()
+        window = max(1, page_window or self.page_window)
+
+        with temporary_pdf(pdf_file) as pdf_path:
+            num_pages = pdfinfo_from_path(pdf_path, poppler_path=poppler_path)["Pages"]
+            layer_texts = {}
+            if self.use_text_layer:
+                with span("pdf.text_layer", page=0, size=num_pages):
+                    layer_texts = self._extract_text_layer(pdf_path, 1, num_pages, poppler_path)
+
+            # Submit every range up front; each worker only holds its own pages in memory
+            pool = self._get_pool()
+            shards = {}
+            page = 1
+            while page <= num_pages:
+                if page in layer_texts:
+                    page += 1
+                    continue
+                last_page = page
+                while last_page < num_pages and last_page - page + 1 < window and (last_page + 1) not in layer_texts:
+                    last_page += 1
+                shards[page] = (last_page, pool.submit(_ocr_page_range, pdf_path, page, last_page, poppler_path))
+                page = last_page + 1
+
+            try:
+                page = 1
+                while page <= num_pages:
+                    if page in layer_texts:
+                        count("ocr.text_layer_pages")
+                        yield {"index": page - 1, "num_pages": num_pages,
+                               "text": layer_texts[page], "source": "text_layer", "regions": None,
+                               "fingerprint": _text_layer_fingerprint(layer_texts[page])}
+                        page += 1
+                        continue
+                    last_page, future = shards.pop(page)
+                    # Only the time spent waiting on the workers shows up here
+                    with span("ocr.shard_wait", page=page - 1, size=last_page - page + 1):
+                        results = future.result()
+                    for index, text, source, regions, fingerprint in results:
+                        if self.cache is not None:
+                            count("ocr.cache_hits" if source == "ocr_cache" else "ocr.cache_misses")
+                        yield {"index": index, "num_pages": num_pages, "text": text, "source": source,
+                               "regions": regions, "fingerprint": fingerprint}
+                    page = last_page + 1
+            finally:
+                # Stopped early: drop the ranges no worker has started yet
+                for _, future in shards.values():
+                    future.cancel()
+
+    def process_pdf(self, pdf_file):
+        """Returns the OCR text of every page as a list (see iter_pages)."""
+        return [page["text"] for page in self.iter_pages(pdf_file)]
@@ -0,0 +1,335 @@
+import contextvars
+import queue
+import threading
+from contextlib import closing
+
+from src.postprocess import PAGE_BREAK, clean_final_text, join_pages
+from src.instrumentation import count, span
+
+# Marks the end of a stage's output; errors travel down the queues as _Failure
+_DONE = object()
+
+
+class _Failure:
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+
+class _Stopped(Exception):
+    """Raised inside a stage thread when the run is being torn down."""
+
+
+class DocumentPipeline:
+    """
+    Runs a PDF through rasterize -> OCR -> correct -> translate.
+
+    pipelined=True overlaps the stages: each one runs in its own thread and
+    hands pages to the next through a bounded queue, so page N+1 rasterizes
+    while page N is in OCR and page N-1 is being corrected. Pages are put back
+    in order before they are returned.
+    pipelined=False runs each stage over the whole document before starting
+    the next (correction is then batched across all pages). When pipelined,
+    the correct stage batches the OCR'd pages that are already waiting for
+    it, up to `correct_batch_pages`.
+
+    With a `page_store` (a SQLiteCache), every page's results are kept under
+    its fingerprint (see OCREngine.iter_rendered_pages). A page already seen
+    in an earlier upload, e.g. an unchanged page of a revised PDF, skips OCR,
+    correction and translation.
+    """
+
+    def __init__(self, ocr_engine, corrector, translator, use_correction=True, queue_size=2, page_store=None,
+                 correction_key=None, correct_batch_pages=8):
+        self.ocr_engine = ocr_engine
+        self.corrector = corrector
+        self.translator = translator
+        self.use_correction = use_correction and corrector is not None
+        # Pages allowed to wait between two stages (bounds memory: rendered images queue here)
+        self.queue_size = max(1, queue_size)
+        # OCR'd pages (text only) the correct stage may take at once; they wait
+        # in a queue this long while the model is busy
+        self.correct_batch_pages = max(1, correct_batch_pages)
+        # Fingerprint -> {"raw_text", "source", "regions",
+        #                 "corrections": {correction key: {"text", "braille": {grade: braille}}}}
+        self.page_store = page_store
+        # Settings the stored corrections and braille of a page must match
+        # (corrector.settings_key(); pass it in when the corrector may still be
+        # loading, see TextCorrector.options_key). Otherwise asked of the
+        # corrector the first time a page needs it.
+        self._correction_key = correction_key if self.use_correction else "none"
+
+    def run(self, pdf_file, pipelined=True, progress_callback=None):
+        """
+        Converts one PDF. `progress_callback(stage, done, total)` is called from
+        the calling thread only, so it may update UI widgets.
+        Returns {"raw_pages", "corrected_pages", "page_sources", "raw_english",
+                 "english", "braille", "correction_stats": {"regions", "skipped"},
+                 "page_reuse": {"reused", "recomputed"}}.
+        """
+        # OCR regions seen by the corrector / kept without the model (confidence gating)
+        correction_stats = {"regions": 0, "skipped": 0}
+        # Wall time of the whole run; the stage spans overlap when pipelined
+        with span("pipeline.run", pipelined=pipelined):
+            if pipelined:
+                pages = self._run_pipelined(pdf_file, progress_callback, correction_stats)
+            else:
+                pages = self._run_sequential(pdf_file, progress_callback, correction_stats)
+            result = self._assemble(pages)
+            self._store_pages(pages)
+        result["correction_stats"] = correction_stats
+        reused = sum(1 for page in pages if page.get("reused"))
+        result["page_reuse"] = {"reused": reused, "recomputed": len(pages) - reused}
+        return result
+
+    # ----------------------------------------------------------------------
+    # Per-page results of earlier runs
+    # ----------------------------------------------------------------------
+    def _source_pages(self, pdf_file):
+        # With OCR worker processes, rasterize + OCR already overlap inside
+        # iter_pages (unchanged pages are OCR cache hits there); otherwise OCR
+        # is left to _recognize so stored pages can skip it
+        if self.ocr_engine.workers > 1:
+            return self.ocr_engine.iter_pages(pdf_file)
+        return self.ocr_engine.iter_rendered_pages(pdf_file)
+
+    def _settings_key(self):
+        if self._correction_key is None:
+            self._correction_key = self.corrector.settings_key()
+        return self._correction_key
+
+    def _recognize(self, page):
+        """OCRs a page, unless a page with the same fingerprint was stored before."""
+        stored = None
+        if self.page_store is not None and page.get("fingerprint"):
+            stored = self.page_store.get(page["fingerprint"])
+        if stored is None:
+            return self.ocr_engine.recognize_page(page)
+
+        page.pop("image", None)
+        page.pop("rerender", None)
+        page.update(text=stored["raw_text"], source=stored["source"], regions=stored["regions"], stored=stored)
+        return page
+
+    def _stored_correction(self, page):
+        """The stored {"text", "braille"} of this page for the current settings, or None."""
+        stored = page.get("stored")
+        if stored is None:
+            return None
+        correction = stored["corrections"].get(self._settings_key())
+        if correction is not None:
+            # Reused as a whole: OCR and correction are skipped, translation too when stored
+            page["reused"] = True
+            page["braille"] = correction["braille"].get(str(self.translator.grade))
+        return correction
+
+    def _store_pages(self, pages):
+        if self.page_store is None:
+            return
+        entries = {}
+        for page in pages:
+            if not page.get("fingerprint"):
+                continue
+            entry = page.get("stored") or {"raw_text": page["raw_text"], "source": page["source"],
+                                           "regions": page.get("regions"), "corrections": {}}
+            correction = entry["corrections"].setdefault(self._settings_key(),
+                                                         {"text": page["corrected_text"], "braille": {}})
+            if page.get("braille") is not None:
+                correction["braille"][str(self.translator.grade)] = page["braille"]
+            entries[page["fingerprint"]] = entry
+        count("pipeline.pages_reused", sum(1 for page in pages if page.get("reused")))
+        with span("pipeline.store_pages", size=len(entries)):
+            self.page_store.set_many(entries)
+
+    # ----------------------------------------------------------------------
+    # Sequential: one stage over the whole document at a time
+    # ----------------------------------------------------------------------
+    def _run_sequential(self, pdf_file, progress_callback, correction_stats):
+        pages = []
+        with span("stage.ocr"):
+            for page in self._source_pages(pdf_file):
+                pages.append(self._recognize(page))
+                if progress_callback is not None:
+                    progress_callback("ocr", page["index"] + 1, page["num_pages"])
+
+        for page in pages:
+            page["raw_text"] = page.pop("text")
+            correction = self._stored_correction(page)
+            page["corrected_text"] = correction["text"] if correction is not None else page["raw_text"]
+
+        # Only pages without a stored correction go through the corrector
+        todo = [page for page in pages if not page.get("reused")]
+        if self.use_correction and todo:
+            def correction_progress(done, total):
+                if progress_callback is not None:
+                    progress_callback("correct", done, total)
+            with span("stage.correct", size=len(todo)):
+                corrected_texts = self.corrector.correct_pages(
+                    [page["raw_text"] for page in todo], progress_callback=correction_progress,
+                    regions=[page.get("regions") for page in todo], stats=correction_stats,
+                    sources=[page["source"] for page in todo]
+                )
+            for page, corrected in zip(todo, corrected_texts):
+                page["corrected_text"] = corrected
+        return pages
+
+    # ----------------------------------------------------------------------
+    # Pipelined: one thread per stage, bounded queues in between
+    # ----------------------------------------------------------------------
+    def _run_pipelined(self, pdf_file, progress_callback, correction_stats):
+        stop = threading.Event()
+        rendered = queue.Queue(self.queue_size)
+        recognized = queue.Queue(max(self.queue_size, self.correct_batch_pages))
+        corrected = queue.Queue(self.queue_size)
+
+        def put(out_queue, item):
+            # Blocks while the next stage is busy, but gives up once the run stops
+            while not stop.is_set():
+                try:
+                    out_queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+            raise _Stopped()
+
+        def rasterize():
+            with closing(self._source_pages(pdf_file)) as rendered_pages:
+                for page in rendered_pages:
+                    put(rendered, page)
+
+        def recognize():
+            for page in _drain(rendered, stop):
+                with span("stage.ocr", page=page["index"]):
+                    page = self._recognize(page)
+                page["raw_text"] = page.pop("text")
+                put(recognized, page)
+
+        def correct():
+            # Pages that piled up while the model was busy are corrected in one
+            # correct_pages() call (length-bucketed batches across them)
+            for batch in _drain_batches(recognized, stop, self.correct_batch_pages):
+                todo = []
+                for page in batch:
+                    correction = self._stored_correction(page)
+                    if correction is not None:
+                        page["corrected_text"] = correction["text"]
+                    elif self.use_correction:
+                        todo.append(page)
+                    else:
+                        page["corrected_text"] = page["raw_text"]
+                if todo:
+                    with span("stage.correct", page=todo[0]["index"], size=len(todo)):
+                        corrected_texts = self.corrector.correct_pages(
+                            [page["raw_text"] for page in todo], regions=[page.get("regions") for page in todo],
+                            stats=correction_stats, sources=[page["source"] for page in todo]
+                        )
+                    for page, corrected_text in zip(todo, corrected_texts):
+                        page["corrected_text"] = corrected_text
+                for page in batch:
+                    put(corrected, page)
+
+        def stage(target, out_queue):
+            # Every stage ends by passing _DONE (or the error) downstream
+            try:
+                target()
+                result = _DONE
+            except _Stopped:
+                return
+            except BaseException as error:
+                result = _Failure(error)
+            try:
+                put(out_queue, result)
+            except _Stopped:
+                pass
+
+        threads = [
+            # Each thread gets its own copy of the context so instrumentation follows it
+            threading.Thread(target=contextvars.copy_context().run, args=(stage, target, out_queue),
+                             name=f"pipeline-{target.__name__}", daemon=True)
+            for target, out_queue in ((rasterize, rendered), (recognize, recognized), (correct, corrected))
+        ]
+        for thread in threads:
+            thread.start()
+
+        pages = []
+        try:
+            # The calling thread translates and reports progress as pages come out
+            for page in _drain(corrected, stop):
+                if page.get("braille") is None:
+                    with span("stage.translate", page=page["index"], size=len(page["corrected_text"])):
+                        page["braille"] = self.translator.translate(clean_final_text(page["corrected_text"]))
+                pages.append(page)
+                if progress_callback is not None:
+                    progress_callback("pipeline", len(pages), page["num_pages"])
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        pages.sort(key=lambda page: page["index"])
+        return pages
+
+    # ----------------------------------------------------------------------
+    def _assemble(self, pages):
+        raw_pages = [page["raw_text"] for page in pages]
+        corrected_pages = [page["corrected_text"] for page in pages]
+        english = clean_final_text(join_pages(corrected_pages))
+
+        # Per-page translations (pipelined, or stored) are reused only when
+        # cleaning page by page gives exactly the same English as cleaning the
+        # joined document; pages without one are then translated on their own
+        # (always with a page store, so the next run can reuse them)
+        if (pages and (self.page_store is not None or any(page.get("braille") is not None for page in pages))
+                and join_pages(clean_final_text(text) for text in corrected_pages) == english):
+            for page in pages:
+                if page.get("braille") is None:
+                    with span("stage.translate", page=page["index"], size=len(page["corrected_text"])):
+                        page["braille"] = self.translator.translate(clean_final_text(page["corrected_text"]))
+            braille = self.translator.translate(PAGE_BREAK).join(page["braille"] for page in pages)
+        else:
+            with span("stage.translate", size=len(english)):
+                braille = self.translator.translate(english)
+
+        return {
+            "raw_pages": raw_pages,
+            "corrected_pages": corrected_pages,
+            "page_sources": [page["source"] for page in pages],
+            "raw_english": join_pages(raw_pages),
+            "english": english,
+            "braille": braille,
+        }
+
+
+def _drain(in_queue, stop):
+    """Yields items from an upstream stage until it is done; re-raises its error."""
+    while True:
+        try:
+            item = in_queue.get(timeout=0.1)
+        except queue.Empty:
+            if stop.is_set():
+                raise _Stopped()
+            continue
+        if item is _DONE:
+            return
+        if isinstance(item, _Failure):
+            raise item.error
+        yield item
+
+
+def _drain_batches(in_queue, stop, max_items):
+    """Like _drain, but yields lists: the next item plus whatever else is already waiting, up to max_items."""
+    for item in _drain(in_queue, stop):
+        batch = [item]
+        while len(batch) < max_items:
+            try:
+                item = in_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                yield batch
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            batch.append(item)
+        yield batch
@@ -0,0 +1,24 @@
+import re
+
+# Separator placed between pages of the combined document
+PAGE_BREAK = "\n\n-- Page Break --\n\n"
+
+
+def clean_final_text(text):
+    """
+    FIXED: Removes common repetitive OCR artifacts, including tokens with punctuation,
+    and repeated headers/phrases that span multiple lines.
+    """
+    # Replace :. with .
+    text = re.sub(r'\:\.', '.', text)
+    # Replace ;. with .
+    text = re.sub(r'\;\.', '.', text)
+    # Remove excessive blank lines
+    text = re.sub(r'(\n\s*){3,}', '\n\n', text)
+    
+    return text
+
+
+def join_pages(page_texts):
+    """Combines per-page texts into one document with page break markers."""
+    return PAGE_BREAK.join(page_texts)
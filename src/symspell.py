@@ -0,0 +1,313 @@
+import hashlib
+import itertools
+import json
+import os
+import re
+
+import Levenshtein
+import numpy as np
+
+# Word-frequency list: one "word count" pair per line (SymSpell's English
+# dictionary, MIT licensed, see assets/dictionaries/LICENSE)
+DICTIONARY_PATH = os.path.join("assets", "dictionaries", "frequency_dictionary_en_82_765.txt")
+INDEX_DIR = os.path.join(".cache", "symspell_index")
+
+# Bumped whenever the on-disk index layout or hashing changes
+_INDEX_VERSION = 1
+
+# Letters, digits and apostrophes; digits are included so "he1lo" is one token
+_TOKEN = re.compile(r"[A-Za-z0-9]+(?:'[A-Za-z]+)?")
+
+# OCR confusions tried before the edit-distance search, at each occurrence and
+# every combination of occurrences ("rnodern" -> "modern", not "modem")
+OCR_CONFUSIONS = (("rn", "m"), ("cl", "d"), ("vv", "w"), ("li", "h"), ("1", "l"), ("0", "o"), ("5", "s"), ("8", "b"))
+# Occurrences beyond this many are left as they are (2 ** n candidates)
+_MAX_CONFUSIONS = 6
+
+# Whitespace-separated words that are addresses, not prose (URLs, e-mails, paths)
+_ADDRESS = re.compile(r"[@/]|www\.", re.IGNORECASE)
+
+
+def _hash(text):
+    # Stable 64-bit hash (Python's hash() is salted per process)
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _deletes(word, max_distance, prefix_length):
+    """The word's prefix plus every string made by deleting up to max_distance characters from it."""
+    prefix = word[:prefix_length]
+    found = {prefix}
+    frontier = [prefix]
+    for _ in range(max_distance):
+        next_frontier = []
+        for item in frontier:
+            for i in range(len(item)):
+                shorter = item[:i] + item[i + 1:]
+                if shorter not in found:
+                    found.add(shorter)
+                    next_frontier.append(shorter)
+        frontier = next_frontier
+    return found
+
+
+def build_index(dictionary_path=DICTIONARY_PATH, index_dir=INDEX_DIR, max_distance=2, prefix_length=7, min_count=1):
+    """
+    Precomputes the symmetric-delete index of a word-frequency list into
+    `index_dir` as plain .npy arrays, so SymSpell can memory-map them:
+        words.npy / offsets.npy - UTF-8 words back to back, and where each starts
+        counts.npy              - frequency per word
+        hashes.npy / ids.npy    - hash of every delete, sorted, and the word it came from
+    """
+    words = []
+    counts = []
+    with open(dictionary_path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and int(parts[1]) >= min_count:
+                words.append(parts[0].lower())
+                counts.append(int(parts[1]))
+
+    hashes = []
+    ids = []
+    for word_id, word in enumerate(words):
+        for delete in _deletes(word, max_distance, prefix_length):
+            hashes.append(_hash(delete))
+            ids.append(word_id)
+    hashes = np.array(hashes, dtype=np.uint64)
+    ids = np.array(ids, dtype=np.uint32)
+    order = np.argsort(hashes, kind="stable")
+
+    encoded = [word.encode("utf-8") for word in words]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(word) for word in encoded])
+
+    os.makedirs(index_dir, exist_ok=True)
+    np.save(os.path.join(index_dir, "words.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    np.save(os.path.join(index_dir, "offsets.npy"), offsets)
+    np.save(os.path.join(index_dir, "counts.npy"), np.array(counts, dtype=np.uint64))
+    np.save(os.path.join(index_dir, "hashes.npy"), hashes[order])
+    np.save(os.path.join(index_dir, "ids.npy"), ids[order])
+    # Written last: an index without meta.json is treated as incomplete
+    with open(os.path.join(index_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": _INDEX_VERSION, "dictionary": os.path.abspath(dictionary_path),
+                   "dictionary_mtime": os.path.getmtime(dictionary_path), "words": len(words),
+                   "max_distance": max_distance, "prefix_length": prefix_length}, f)
+    return index_dir
+
+
+class SymSpell:
+    """
+    Dictionary spelling correction (symmetric delete algorithm) over a
+    precomputed, memory-mapped index. The index is built on first use and
+    rebuilt when the dictionary file changes.
+    """
+
+    def __init__(self, dictionary_path=DICTIONARY_PATH, index_dir=INDEX_DIR, max_distance=2, prefix_length=7,
+                 min_count=5_000_000, dominance=8.0):
+        meta = self._read_meta(index_dir)
+        if (meta is None or meta["version"] != _INDEX_VERSION
+                or meta["dictionary"] != os.path.abspath(dictionary_path)
+                or meta["dictionary_mtime"] != os.path.getmtime(dictionary_path)
+                or meta["max_distance"] != max_distance or meta["prefix_length"] != prefix_length):
+            build_index(dictionary_path, index_dir, max_distance, prefix_length)
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        # An edit-distance fix is only made when the candidate is a common word
+        # (at least `min_count` in the frequency list) and `dominance` times as
+        # frequent as all other candidates at that distance together; rare words
+        # and jargon missing from the list ("cyber", "rumors") are otherwise
+        # "corrected" into a different word
+        self.min_count = min_count
+        self.dominance = dominance
+
+        # Memory-mapped: loading is near-instant and pages are shared between processes
+        def load(name):
+            return np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r")
+        self._words = load("words")
+        # Plain buffer view of the mapped words: slicing it skips numpy's per-call overhead
+        self._blob = memoryview(self._words)
+        self._offsets = load("offsets")
+        self._counts = load("counts")
+        self._hashes = load("hashes")
+        self._ids = load("ids")
+        self._memo = {}
+
+    @staticmethod
+    def _read_meta(index_dir):
+        try:
+            with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _word(self, word_id):
+        return bytes(self._blob[int(self._offsets[word_id]):int(self._offsets[word_id + 1])]).decode("utf-8")
+
+    def _candidate_ids(self, deletes):
+        """Ids of the dictionary words sharing any of these deletes (hash matches, unverified)."""
+        keys = np.array([_hash(delete) for delete in deletes], dtype=np.uint64)
+        starts = np.searchsorted(self._hashes, keys, side="left")
+        ends = np.searchsorted(self._hashes, keys, side="right")
+        hits = [self._ids[start:end] for start, end in zip(starts, ends) if end > start]
+        return np.unique(np.concatenate(hits)) if hits else np.empty(0, dtype=np.uint32)
+
+    def _word_id(self, word):
+        encoded = word.encode("utf-8")
+        ids = self._candidate_ids([word[:self.prefix_length]])
+        lengths = self._offsets[ids + 1] - self._offsets[ids]
+        for word_id in ids[lengths == len(encoded)]:
+            if self._word(int(word_id)) == word:
+                return int(word_id)
+        return None
+
+    def is_known(self, word):
+        return self._word_id(word.lower()) is not None
+
+    def _fix_confusions(self, word):
+        """The most frequent dictionary word that undoing OCR confusions in `word` gives, or None."""
+        best, best_count = None, 0
+        for candidate in _confusion_candidates(word):
+            word_id = self._word_id(candidate)
+            if word_id is not None and int(self._counts[word_id]) > best_count:
+                best, best_count = candidate, int(self._counts[word_id])
+        return best
+
+    def lookup(self, word, max_distance=None):
+        """
+        Closest dictionary word to `word` (lowercase) within max_distance edits
+        (a single adjacent transposition counts as one), most frequent first on
+        ties, or None.
+        """
+        return self._lookup(word, max_distance)[0]
+
+    def _lookup(self, word, max_distance=None):
+        """
+        Returns (closest word or None, its count, total count of the other
+        words at the same distance).
+        """
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        memo_key = (word, max_distance)
+        if memo_key in self._memo:
+            return self._memo[memo_key]
+
+        ids = self._candidate_ids(_deletes(word, max_distance, self.prefix_length))
+        # Words whose length alone rules them out are dropped before decoding
+        lengths = (self._offsets[ids + 1] - self._offsets[ids]).astype(np.int64)
+        ids = ids[np.abs(lengths - len(word.encode("utf-8"))) <= max_distance]
+
+        best, best_distance, best_count = None, max_distance + 1, -1
+        # Counts of the words found at the best distance so far
+        tied = 0
+        starts = self._offsets[ids].tolist()
+        ends = self._offsets[ids + 1].tolist()
+        for word_id, start, end in zip(ids.tolist(), starts, ends):
+            candidate = bytes(self._blob[start:end]).decode("utf-8")
+            distance = Levenshtein.distance(word, candidate, score_cutoff=max_distance + 1)
+            # One swapped pair of letters ("teh") counts as a single edit
+            if distance == 2 and _is_transposition(word, candidate):
+                distance = 1
+            if distance > max_distance:
+                continue
+            count = int(self._counts[word_id])
+            if distance < best_distance:
+                tied = 0
+            elif distance > best_distance:
+                continue
+            tied += count
+            if distance < best_distance or count > best_count:
+                best, best_distance, best_count = candidate, distance, count
+
+        result = (best, best_count, tied - best_count) if best is not None else (None, 0, 0)
+        if len(self._memo) > 100_000:
+            self._memo.clear()
+        self._memo[memo_key] = result
+        return result
+
+    def correct_token(self, token):
+        """Returns (corrected token, known) keeping the token's capitalisation."""
+        lower = token.lower()
+        if lower.isdigit() or self.is_known(lower):
+            return token, True
+        # Acronyms (NIST, ISO, OCHA) are not in the dictionary and must stay as they are
+        if token.isupper() and len(token) > 1:
+            return token, True
+
+        # 1. Known OCR confusions (rn -> m, 1 -> l, ...)
+        fixed = self._fix_confusions(lower)
+        if fixed is not None:
+            return _match_case(token, fixed), True
+        if any(char.isdigit() for char in lower):
+            # Mixed letters and digits that no confusion explains: leave alone
+            return token, False
+
+        # 2. Edit-distance search, for lowercase words only: capitalised ones are
+        #    mostly names ("Priya", "Faso") the dictionary does not know
+        if len(lower) < 4 or token[0].isupper():
+            return token, False
+        max_distance = 1 if len(lower) < 8 else self.max_distance
+        fixed, fixed_count, others = self._lookup(lower, max_distance)
+        if fixed is None or fixed_count < self.min_count or fixed_count < self.dominance * others:
+            return token, False
+        return _match_case(token, fixed), True
+
+    def correct_line(self, line):
+        """
+        Corrects every token of a line. Returns (corrected line, unknown ratio):
+        the share of word tokens that are still not dictionary words.
+        """
+        words = 0
+        unknown = 0
+        parts = []
+        last = 0
+        # Addresses are left alone as a whole ("www" in a URL is not a typo)
+        addresses = [match.span() for match in re.finditer(r"\S+", line) if _ADDRESS.search(match.group())]
+        for match in _TOKEN.finditer(line):
+            token = match.group()
+            parts.append(line[last:match.start()])
+            last = match.end()
+            if token.isdigit() or any(start <= match.start() < end for start, end in addresses):
+                parts.append(token)
+                continue
+            fixed, known = self.correct_token(token)
+            words += 1
+            unknown += not known
+            parts.append(fixed)
+        parts.append(line[last:])
+        return "".join(parts), (unknown / words if words else 0.0)
+
+
+def _confusion_candidates(word):
+    """Every variant of `word` with one or more non-overlapping OCR_CONFUSIONS occurrences undone."""
+    occurrences = sorted(
+        (match.start(), wrong, right)
+        for wrong, right in OCR_CONFUSIONS
+        for match in re.finditer(f"(?={re.escape(wrong)})", word)
+    )[:_MAX_CONFUSIONS]
+    candidates = []
+    for size in range(1, len(occurrences) + 1):
+        for chosen in itertools.combinations(occurrences, size):
+            # Overlapping occurrences ("vvv") cannot both be undone
+            if any(after[0] < before[0] + len(before[1]) for before, after in zip(chosen, chosen[1:])):
+                continue
+            candidate = word
+            # Right to left, so earlier positions stay valid
+            for start, wrong, right in reversed(chosen):
+                candidate = candidate[:start] + right + candidate[start + len(wrong):]
+            candidates.append(candidate)
+    return candidates
+
+
+def _is_transposition(a, b):
+    """True when b is a with exactly one pair of adjacent letters swapped."""
+    if len(a) != len(b):
+        return False
+    diff = [i for i in range(len(a)) if a[i] != b[i]]
+    return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+
+
+def _match_case(original, word):
+    if original.isupper() and len(original) > 1:
+        return word.upper()
+    if original[0].isupper():
+        return word[0].upper() + word[1:]
+    return word
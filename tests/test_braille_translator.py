@@ -0,0 +1,51 @@
+"""
+BrailleTranslator (grade 1) against the original per-character loop, on the
+ground-truth texts and edge cases, whole and in chunks of any size.
+"""
+import os
+
+import pytest
+
+from src.braille_mapper import BrailleTranslator
+from benchmarks.braille_benchmark import load_corpus, reference_translate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EDGE_CASES = [
+    "",
+    "Hello, World!",
+    "ABC def 123 4.5 6,7",
+    "Page 12\n\n-- Page Break --\n\nPage 13",
+    "x²+y³ = z¹⁰ and ①② and ٣٤ (Arabic-Indic)",
+    "Éclair naïve façade İstanbul ß ẞ ǅ",
+    "tabs\tand\rcarriage returns\x0c",
+    "1 22 333 a1b2c3 9-8-7",
+    "\"quoted\" 'single' (paren) semi;colon: dash- question? bang!",
+    "emoji 🙂 and CJK 漢字",
+]
+
+CORPUS = load_corpus(os.path.join(ROOT, "assets", "Ground_truth"))
+SAMPLES = [pytest.param(text, id=name) for name, text in CORPUS.items()] + \
+          [pytest.param(text, id=f"edge-{index}") for index, text in enumerate(EDGE_CASES)]
+
+
+@pytest.fixture(scope="module")
+def translator():
+    return BrailleTranslator()
+
+
+def test_corpus_found():
+    assert CORPUS, "no ground-truth texts in assets/Ground_truth"
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_translate_matches_reference(translator, text):
+    assert translator.translate(text) == reference_translate(translator, text)
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 4096])
+@pytest.mark.parametrize("text", SAMPLES)
+def test_translate_iter_matches_reference(translator, text, size):
+    # Chunked output must be identical wherever the text is split
+    chunks = [text[i:i + size] for i in range(0, len(text), size)]
+    assert "".join(translator.translate_iter(chunks)) == reference_translate(translator, text)
@@ -0,0 +1,88 @@
+"""
+SQLiteCache and LRUCache: eviction order, persistence, batch round trips,
+key derivation and hit/miss counters.
+"""
+import itertools
+
+import pytest
+
+import src.cache
+from src.cache import LRUCache, SQLiteCache, make_key
+
+# Every key plus JSON value below takes exactly 100 bytes
+VALUE = "x" * 97
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Strictly increasing timestamps, so the LRU order never depends on timer resolution
+    ticks = itertools.count(1)
+    monkeypatch.setattr(src.cache.time, "time", lambda: float(next(ticks)))
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache.sqlite")
+
+
+def test_evicts_least_recently_used_at_byte_limit(path, clock):
+    cache = SQLiteCache(path, max_bytes=350)
+    for key in "abc":
+        cache.set(key, VALUE)
+    cache.get("a")
+    cache.set("d", VALUE)
+    # Over the limit: the least recently used entries go until 90% of it is left
+    assert cache.get_many("abcd") == {"a": VALUE, "c": VALUE, "d": VALUE}
+    assert cache.stats()["bytes"] == 300
+
+
+def test_limit_holds_across_instances_sharing_a_file(path, clock):
+    writers = [SQLiteCache(path, max_bytes=1000) for _ in range(2)]
+    for number in range(50):
+        writers[number % 2].set(f"{number:02d}", "x" * 96)
+    assert all(writer.stats()["bytes"] <= 1000 for writer in writers)
+
+
+def test_persists_across_instances(path):
+    SQLiteCache(path).set("key", {"text": "Hello", "pages": [1, 2]})
+    assert SQLiteCache(path).get("key") == {"text": "Hello", "pages": [1, 2]}
+
+
+def test_get_many_set_many_round_trip(path):
+    cache = SQLiteCache(path)
+    # More keys than SQLite parameters per statement
+    items = {f"key{number}": {"number": number} for number in range(2000)}
+    cache.set_many(items)
+    assert cache.get_many(list(items) + ["missing"]) == items
+    cache.set_many({"key1": "replaced"})
+    assert cache.get("key1") == "replaced"
+    assert cache.stats()["entries"] == 2000
+
+
+def test_stats_counters(path):
+    cache = SQLiteCache(path)
+    cache.set("a", VALUE)
+    cache.get("a")
+    cache.get_many(["a", "b", "c"])
+    assert cache.stats() == {"hits": 2, "misses": 2, "hit_rate": 0.5, "entries": 1, "bytes": 100}
+    cache.clear()
+    assert cache.stats()["entries"] == cache.stats()["bytes"] == 0
+
+
+def test_make_key_depends_on_every_setting():
+    key = make_key("page", {"dpi": 200, "grayscale": True}, "en")
+    assert make_key("page", {"grayscale": True, "dpi": 200}, "en") == key
+    assert make_key("page", {"dpi": 300, "grayscale": True}, "en") != key
+    assert make_key("page", {"dpi": 200, "grayscale": False}, "en") != key
+    assert make_key("page", {"dpi": 200, "grayscale": True}, "fr") != key
+    assert make_key("page", {"dpi": 200, "grayscale": True}) != key
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    assert len(cache) == 2
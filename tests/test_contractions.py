@@ -0,0 +1,67 @@
+"""
+Grade 2 (UEB) contractions: each case is print text and its expected braille.
+"""
+import pytest
+
+from src.braille_mapper import BrailleTranslator
+from src.postprocess import join_pages
+from benchmarks.braille_benchmark import load_corpus
+
+# (print, expected grade 2 braille)
+STANDARD_CONTRACTIONS = [
+    # Strong contractions, whole word and part word
+    ("the", "⠮"), ("and", "⠯"), ("for", "⠿"), ("of", "⠷"), ("with", "⠾"),
+    ("therefore", "⠐⠮⠿⠑"), ("often", "⠷⠞⠢"),
+    # Alphabetic and strong wordsigns
+    ("but", "⠃"), ("can", "⠉"), ("knowledge", "⠅"), ("child", "⠡"), ("this", "⠹"),
+    # Wordsigns only stand alone
+    ("canal", "⠉⠁⠝⠁⠇"), ("butter", "⠃⠥⠞⠞⠻"),
+    # Groupsigns
+    ("think", "⠹⠔⠅"), ("sing", "⠎⠬"), ("shout", "⠩⠳⠞"), ("star", "⠌⠜"),
+    ("ingot", "⠔⠛⠕⠞"),
+    # Lower signs
+    ("were", "⠶"), ("was", "⠴"), ("his", "⠦"), ("be", "⠆"), ("in", "⠔"),
+    ("rabbit", "⠗⠁⠆⠊⠞"), ("disable", "⠲⠁⠃⠇⠑"), ("concern", "⠒⠉⠻⠝"),
+    ("bread", "⠃⠗⠂⠙"),
+    # be / con / dis only where they are the first syllable
+    ("become", "⠆⠉⠕⠍⠑"), ("being", "⠆⠬"), ("distance", "⠲⠞⠨⠑"), ("connect", "⠒⠝⠑⠉⠞"),
+    ("bed", "⠃⠫"), ("best", "⠃⠑⠌"), ("bee", "⠃⠑⠑"), ("bell", "⠃⠑⠇⠇"),
+    ("dish", "⠙⠊⠩"), ("dishes", "⠙⠊⠩⠑⠎"), ("disc", "⠙⠊⠎⠉"), ("cone", "⠉⠐⠕"), ("cons", "⠉⠕⠝⠎"),
+    # Initial- and final-letter contractions
+    ("father", "⠐⠋"), ("question", "⠐⠟"), ("world", "⠸⠺"), ("these", "⠘⠮"),
+    ("sound", "⠎⠨⠙"), ("nation", "⠝⠁⠰⠝"), ("kindness", "⠅⠔⠙⠰⠎"),
+    ("everyone", "⠐⠑⠽⠐⠕"),
+    # Shortforms
+    ("about", "⠁⠃"), ("children", "⠡⠝"), ("great", "⠛⠗⠞"), ("would", "⠺⠙"),
+    # Capitals, letters standing alone, apostrophes, punctuation and numbers
+    ("The", "⠠⠮"), ("THE", "⠠⠠⠮"), ("Hello world", "⠠⠓⠑⠇⠇⠕ ⠸⠺"),
+    ("b", "⠰⠃"), ("a", "⠁"), ("don't", "⠙⠕⠝⠄⠞"),
+    # Before an apostrophe the stem contracts as a word; the suffix is spelled out
+    ("children's", "⠡⠝⠄⠎"), ("it's", "⠭⠄⠎"), ("IT'S", "⠠⠠⠭⠄⠎"), ("you're", "⠽⠄⠗⠑"),
+    ("the end.", "⠮ ⠢⠙⠲"), ("Page 12", "⠠⠏⠁⠛⠑ ⠼⠁⠃"),
+]
+
+
+@pytest.fixture(scope="module")
+def translator():
+    return BrailleTranslator(grade=2)
+
+
+@pytest.mark.parametrize("text, expected", STANDARD_CONTRACTIONS, ids=[text for text, _ in STANDARD_CONTRACTIONS])
+def test_contraction(translator, text, expected):
+    assert translator.translate(text) == expected
+
+
+def test_translate_iter_matches_translate(translator):
+    text = " ".join(text for text, _ in STANDARD_CONTRACTIONS)
+    for size in (1, 3, 16):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert "".join(translator.translate_iter(chunks)) == translator.translate(text)
+
+
+@pytest.mark.parametrize("size", [7, 4096])
+def test_translate_iter_matches_translate_on_corpus(translator, size):
+    corpus = join_pages(load_corpus().values())
+    assert corpus, "no ground-truth texts in assets/Ground_truth"
+    chunks = (corpus[i:i + size] for i in range(0, len(corpus), size))
+    assert "".join(translator.translate_iter(chunks)) == translator.translate(corpus)
@@ -0,0 +1,74 @@
+"""
+Evaluator metrics: known edit distances, empty texts, the accuracy report,
+and identical scores whether pages are scored serially or in worker processes.
+"""
+import pytest
+
+from src.evaluator import Evaluator
+
+PAGE_BREAK = "\n\n-- Page Break --\n\n"
+
+
+@pytest.fixture(scope="module")
+def evaluator():
+    return Evaluator(workers=1)
+
+
+@pytest.mark.parametrize("predicted, ground_truth, expected", [
+    ("kitten", "sitting", 3 / 7),
+    ("Hello, World!", "hello world", 0.0),  # case, punctuation and spaces are ignored
+    ("abc", "abc", 0.0),
+])
+def test_cer(evaluator, predicted, ground_truth, expected):
+    assert evaluator.calculate_cer(predicted, ground_truth) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("predicted, ground_truth, expected", [
+    ("the dog sat", "the cat sat", 1 / 3),
+    ("the cat", "the cat sat down", 2 / 4),
+    ("The cat, sat.", "the cat sat", 0.0),
+])
+def test_wer(evaluator, predicted, ground_truth, expected):
+    assert evaluator.calculate_wer(predicted, ground_truth) == pytest.approx(expected)
+
+
+def test_char_accuracy(evaluator):
+    assert evaluator.calculate_char_accuracy("hello world", "hello  word") == pytest.approx((1 - 1 / 11) * 100)
+
+
+@pytest.mark.parametrize("predicted, cer, wer, accuracy", [
+    ("", 0.0, 0.0, 100.0),
+    ("some text", 0.0, 0.0, 0.0),
+])
+def test_empty_ground_truth(evaluator, predicted, cer, wer, accuracy):
+    assert evaluator.calculate_cer(predicted, "") == cer
+    assert evaluator.calculate_wer(predicted, "") == wer
+    assert evaluator.calculate_char_accuracy("", predicted) == accuracy
+
+
+def test_accuracy_report(evaluator):
+    predicted = PAGE_BREAK.join(["the dog sat", "on the mat"])
+    ground_truth = PAGE_BREAK.join(["the cat sat", "on the mat"])
+    report = evaluator.get_accuracy_report(predicted, ground_truth)
+    assert report["corrected_wer"] == pytest.approx(100 / 6)
+    assert report["corrected_cer"] == pytest.approx(300 / 17)
+    assert [page["page"] for page in report["pages"]] == [1, 2]
+    assert report["pages"][1]["cer"] == report["pages"][1]["wer"] == 0.0
+    assert report["raw_length"] == len("".join(ground_truth.split()))
+
+
+def test_unpaired_pages_are_scored_as_one(evaluator):
+    scores = evaluator.score_pages("the cat sat on the mat", PAGE_BREAK.join(["the cat sat", "on the mat"]))
+    assert not scores["paired"]
+    assert len(scores["pages"]) == 1
+    assert evaluator.get_accuracy_report("the cat sat on the mat", PAGE_BREAK.join(["the cat sat", "on the mat"]))[
+        "pages"] == []
+
+
+def test_parallel_matches_serial_at_threshold():
+    pages = 4
+    predicted = PAGE_BREAK.join(f"page {number} with sone errrors" for number in range(pages))
+    ground_truth = PAGE_BREAK.join(f"page {number} with some errors" for number in range(pages))
+    serial = Evaluator(workers=1).score_pages(predicted, ground_truth)
+    parallel = Evaluator(workers=2, parallel_min_pages=pages).score_pages(predicted, ground_truth)
+    assert parallel == serial
@@ -0,0 +1,65 @@
+"""
+BRF export of a "book" built from the ground-truth texts: page layout,
+braille ASCII only, page breaks, and identical output whether the braille
+arrives whole or in chunks.
+"""
+import io
+
+import pytest
+
+from src.braille_mapper import BrailleTranslator
+from src.exports import write_brf
+from src.postprocess import join_pages
+from benchmarks.braille_benchmark import load_corpus
+
+CELLS_PER_LINE = 40
+LINES_PER_PAGE = 25
+BOOK = join_pages(list(load_corpus().values()) * 2)
+
+
+def brf_pages(data):
+    pages = data.split(b"\f")
+    assert pages[-1] == b"", "BRF does not end with a form feed"
+    return [page.split(b"\r\n")[:-1] for page in pages[:-1]]
+
+
+@pytest.fixture(scope="module", params=[1, 2], ids=["grade1", "grade2"])
+def book(request):
+    translator = BrailleTranslator(grade=request.param)
+    braille = translator.translate(BOOK)
+    buffer = io.BytesIO()
+    write_brf(braille, buffer, translator=translator)
+    return translator, braille, buffer.getvalue()
+
+
+def test_page_layout(book):
+    _, _, data = book
+    for number, lines in enumerate(brf_pages(data), 1):
+        assert len(lines) <= LINES_PER_PAGE, f"page {number}: {len(lines)} lines"
+        for line in lines:
+            assert len(line) <= CELLS_PER_LINE, f"page {number}: line of {len(line)} cells"
+            assert all(0x20 <= byte < 0x60 for byte in line), f"page {number}: non braille ASCII in {line!r}"
+        expected = b"#" + str(number).translate(str.maketrans("1234567890", "ABCDEFGHIJ")).encode("ascii")
+        assert lines[-1].strip() == expected, f"page {number}: number line {lines[-1]!r}"
+
+
+def test_page_breaks_start_new_pages(book):
+    _, _, data = book
+    assert len(brf_pages(data)) >= BOOK.count("-- Page Break --") + 1
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_chunked_matches_whole(book, chunk_size):
+    translator, braille, data = book
+    chunks = (braille[i:i + chunk_size] for i in range(0, len(braille), chunk_size))
+    buffer = io.BytesIO()
+    write_brf(chunks, buffer, translator=translator)
+    assert buffer.getvalue() == data
+
+
+def test_translated_chunks_match_whole(book):
+    translator, _, data = book
+    buffer = io.BytesIO()
+    write_brf(translator.translate_iter(BOOK[i:i + 4096] for i in range(0, len(BOOK), 4096)), buffer,
+              translator=translator)
+    assert buffer.getvalue() == data
@@ -0,0 +1,67 @@
+"""
+JobStore: cancelling, pruning and the uploaded inputs left on disk.
+"""
+import os
+import time
+
+import pytest
+
+from src.jobs import CANCELLED, JobStore, INPUT_GRACE
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite"))
+
+
+def inputs(store):
+    return sorted(os.listdir(store.input_dir))
+
+
+def test_cancel_queued_job_removes_its_input(store):
+    job_id = store.submit(b"%PDF", {})
+    assert os.path.exists(store.input_path(job_id))
+    assert store.cancel(job_id)
+    assert store.get(job_id)["status"] == CANCELLED
+    assert not os.path.exists(store.input_path(job_id))
+
+
+def test_cancel_then_prune(store):
+    kept = store.submit(b"%PDF", {})
+    cancelled = store.submit(b"%PDF", {})
+    store.cancel(cancelled)
+    assert store.prune(max_age=0) == 1
+    assert store.get(cancelled) is None
+    assert store.get(kept) is not None
+    assert inputs(store) == [f"{kept}.pdf"]
+
+
+def test_cancel_keeps_job_other_sessions_wait_on(store):
+    job_id = store.submit(b"%PDF", {}, dedupe_key="same", session_id="a")
+    assert store.submit(b"%PDF", {}, dedupe_key="same", session_id="b") == job_id
+    assert not store.cancel(job_id, session_id="a")
+    assert os.path.exists(store.input_path(job_id))
+    assert store.cancel(job_id, session_id="b")
+    assert not os.path.exists(store.input_path(job_id))
+
+
+def test_cancelled_orphan_removes_its_input(store):
+    job_id = store.submit(b"%PDF", {})
+    # Claimed by a worker that never registered, so it counts as dead
+    assert store.claim("gone")["id"] == job_id
+    store.cancel(job_id)
+    store.requeue_orphans()
+    assert store.get(job_id)["status"] == CANCELLED
+    assert not os.path.exists(store.input_path(job_id))
+
+
+def test_prune_removes_unreferenced_inputs(store):
+    old, recent = store.input_path("old"), store.input_path("recent")
+    for path in (old, recent):
+        with open(path, "wb") as f:
+            f.write(b"%PDF")
+    stale = time.time() - INPUT_GRACE - 1
+    os.utime(old, (stale, stale))
+    store.prune()
+    # A recent input may belong to a submit() that has not inserted its row yet
+    assert inputs(store) == ["recent.pdf"]
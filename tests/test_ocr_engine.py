@@ -0,0 +1,45 @@
+"""
+Multi-process OCR gives the same text as a single worker. Needs EasyOCR and
+poppler; skipped where they are not installed.
+"""
+import glob
+import os
+import shutil
+
+import pytest
+
+pytest.importorskip("easyocr")
+
+from src.ocr_engine import OCREngine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUNDLED_POPPLER = os.path.join(ROOT, "poppler_binaries", "poppler-25.11.0", "Library", "bin")
+
+pytestmark = pytest.mark.skipif(shutil.which("pdftoppm") is None and not os.path.isdir(BUNDLED_POPPLER),
+                                reason="poppler is not installed")
+
+
+@pytest.fixture(scope="module")
+def pdf_bytes():
+    # The smallest sample keeps the OCR short
+    path = min(glob.glob(os.path.join(ROOT, "assets", "PDFs", "*.pdf")), key=os.path.getsize)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def ocr_texts(pdf_bytes, workers):
+    engine = OCREngine(device="cpu", workers=workers, use_text_layer=False, cache_path=None)
+    try:
+        return [page["text"] for page in engine.iter_pages(pdf_bytes)]
+    finally:
+        engine.close()
+
+
+@pytest.fixture(scope="module")
+def single_worker(pdf_bytes):
+    return ocr_texts(pdf_bytes, 1)
+
+
+@pytest.mark.parametrize("workers", [2, 4])
+def test_workers_match_single_worker(pdf_bytes, single_worker, workers):
+    assert ocr_texts(pdf_bytes, workers) == single_worker
@@ -0,0 +1,61 @@
+"""
+DocumentPipeline with a page store: a revised document reuses the pages it
+shares with the original and gives exactly the output of a fresh run. OCR
+and correction are stand-ins; a "PDF" here is the list of its page texts.
+"""
+import pytest
+
+from src.braille_mapper import BrailleTranslator
+from src.cache import SQLiteCache, make_key
+from src.pipeline import DocumentPipeline
+
+ORIGINAL = [
+    "The first page of the report.",
+    "Water and food for the children of the region.",
+    "A third page, with a list:\n- one\n- two",
+]
+REVISION = [ORIGINAL[0], "Water, food and schools for every child.", ORIGINAL[2]]
+
+
+class FakeOCR:
+    workers = 1
+
+    def __init__(self):
+        self.recognized = []
+
+    def iter_rendered_pages(self, texts):
+        for index, text in enumerate(texts):
+            yield {"index": index, "num_pages": len(texts), "fingerprint": make_key(text), "print": text}
+
+    def recognize_page(self, page):
+        self.recognized.append(page["index"])
+        page.update(text=page.pop("print"), source="ocr", regions=None)
+        return page
+
+
+class FakeCorrector:
+    def settings_key(self):
+        return "fake"
+
+    def correct_pages(self, pages, batch_size=None, progress_callback=None, regions=None, stats=None, sources=None):
+        return [text.replace("  ", " ") for text in pages]
+
+
+@pytest.mark.parametrize("pipelined", [True, False], ids=["pipelined", "sequential"])
+def test_revision_reuses_unchanged_pages(tmp_path, pipelined):
+    def convert(texts, store_name):
+        ocr = FakeOCR()
+        pipeline = DocumentPipeline(ocr, FakeCorrector(), BrailleTranslator(),
+                                    page_store=SQLiteCache(str(tmp_path / store_name)))
+        return pipeline.run(texts, pipelined=pipelined), ocr.recognized
+
+    original, _ = convert(ORIGINAL, "pages.sqlite")
+    assert original["page_reuse"] == {"reused": 0, "recomputed": 3}
+
+    revised, recognized = convert(REVISION, "pages.sqlite")
+    fresh, _ = convert(REVISION, "fresh.sqlite")
+    assert revised["english"] == fresh["english"]
+    assert revised["braille"] == fresh["braille"]
+    assert revised["page_reuse"] == {"reused": 2, "recomputed": 1}
+    # Only the edited page went through OCR
+    assert recognized == [1]
@@ -0,0 +1,36 @@
+"""
+SymSpell correction of OCR text: confusion fixes, case, and clean text.
+"""
+import pytest
+
+from src.symspell import SymSpell
+
+
+@pytest.fixture(scope="module")
+def symspell():
+    return SymSpell()
+
+
+@pytest.mark.parametrize("token, expected", [
+    ("c1ear", "clear"), ("he1lo", "hello"), ("wor1d", "world"), ("tlie", "the"), ("vvere", "were"),
+    ("rnodern", "modern"),  # both "rn" undone would give "modem"
+])
+def test_confusion_fixes(symspell, token, expected):
+    assert symspell.correct_token(token) == (expected, True)
+
+
+@pytest.mark.parametrize("token, expected", [
+    ("Rnodern", "Modern"), ("C1ear", "Clear"),
+    ("NIST", "NIST"),  # acronyms are kept
+])
+def test_case_is_preserved(symspell, token, expected):
+    assert symspell.correct_token(token)[0] == expected
+
+
+@pytest.mark.parametrize("line", [
+    "The modem and the modern world were clear.",
+    "Rumors about cyber attacks spread at www.example.org and info@example.org.",
+    "Priya travelled to Burkina Faso in 2019.",
+])
+def test_clean_text_is_untouched(symspell, line):
+    assert symspell.correct_line(line)[0] == line